@@ -1,14 +1,26 @@
+import argparse
 from datetime import datetime
 
 from _SourceCode import Constants, HelperFunctions
 from _SourceCode.Anonymization import AnonymizationMain
 
-start_time = datetime.now()  # record start time and later, the end time
 
-AnonymizationMain.anonymization_entry_point()
+def main():
+    parser = argparse.ArgumentParser(description="Pseudonymize the annotated hearing files.")
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes pseudonymizing the files in parallel')
 
-# output start time and end time
-print(f"\nStarted at: {start_time.strftime('%d.%m.%Y %H:%M:%S')}")
-end_time = datetime.now()
-print(f"Ended at: {end_time.strftime('%d.%m.%Y %H:%M:%S')}")
-print(HelperFunctions.time_difference(start_time, end_time))
+    args = parser.parse_args()
+
+    start_time = datetime.now()  # record start time and later, the end time
+
+    AnonymizationMain.anonymization_entry_point(workers=args.workers)
+
+    # output start time and end time
+    print(f"\nStarted at: {start_time.strftime('%d.%m.%Y %H:%M:%S')}")
+    end_time = datetime.now()
+    print(f"Ended at: {end_time.strftime('%d.%m.%Y %H:%M:%S')}")
+    print(HelperFunctions.time_difference(start_time, end_time))
+
+
+if __name__ == "__main__":
+    main()
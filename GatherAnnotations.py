@@ -3,15 +3,36 @@ import os
 import warnings
 from datetime import datetime
 
-from _SourceCode import HelperFunctions, Constants
-from _SourceCode.AnnotationUtils import hearing_text_into_annotations
+from _SourceCode import HelperFunctions, Constants, JsonFunctions
+from _SourceCode.AnnotationUtils import hearing_text_into_annotations, TOOL_PRESIDIO, TOOL_SPACY, TOOL_STANFORD_NER
+from _SourceCode.ToolsUtils import ModelManager
 
 
 def main():
     parser = argparse.ArgumentParser(description="Process some files in batches.")
     parser.add_argument('--ignore_1stPage', action='store_true', help='Prevent the information of the first page to be fed into Presidio')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes annotating the files in parallel')
+    parser.add_argument('--preload', action='store_true', help='With --workers, load the models once and fork the workers, which share them')
+    parser.add_argument('--shard', action='store_true', help='With --workers, split the long transcripts across several workers')
+    parser.add_argument('--no_cache', action='store_true', help='Annotate every file again instead of reusing the cached annotations')
+    parser.add_argument('--reclean', action='store_true', help='Only filter and clean the cached raw results of the NER tools again')
+    parser.add_argument('--resume', action='store_true', help='Continue the previous run that was stopped')
+    parser.add_argument('--compact', action='store_true', help='Only compact the annotation store into processed_annotations.json')
+    parser.add_argument('--pipeline', action='store_true', help='Use dedicated processes for each NER tool')
+    parser.add_argument('--presidio_workers', type=int, default=1, help='Number of Presidio processes in --pipeline mode')
+    parser.add_argument('--spacy_workers', type=int, default=1, help='Number of spaCy processes in --pipeline mode')
+    parser.add_argument('--stanford_workers', type=int, default=1, help='Number of StanfordNER processes in --pipeline mode')
 
     args = parser.parse_args()
+
+    if args.compact:
+        if not JsonFunctions.annotation_data_exists():
+            print(f"\nThe file '{JsonFunctions.get_annotation_store_path()}' does not exist. Nothing to compact.\n")
+            return
+        files_count = JsonFunctions.compact_annotation_store()
+        print(f"\n{files_count} transcripts written in '{JsonFunctions.get_legacy_json_path()}'.\n")
+        return
+
     ignore_1st_page = args.ignore_1stPage
     if ignore_1st_page:
         print("\n== Preventing the information of the first page to be fed into Presidio ==")
@@ -27,6 +48,13 @@ def main():
                             Also output the false annotations in the file.
         ignore_1stPage - If true, stop extracting information from the transcripts' first
                             pages and they won't be fed into Presidio. 
+        workers - number of processes annotating the files, each with its own loaded models.
+        preload - with workers, load the models in the main process and fork the workers that share them.
+        shard - with workers, split the long transcripts into shards annotated by several workers.
+        tool_workers - in --pipeline mode, the number of dedicated processes of each NER tool.
+        use_cache - reuse the cached annotations of the files that didn't change since the last run.
+        reclean - don't run the NER tools, replay the filtering and cleaning on their cached raw results.
+        resume - skip the files finished by the previous run (see the run journal) and rebuild the statistics.
     """
 
     directory = Constants.hearings_txt_directory
@@ -41,12 +69,30 @@ def main():
         print(f"\nThe folder '{Constants.hearings_txt_directory}' does not contain .txt files. Please make sure to run HearingsPDFs2Text.py first.\n")
         return
 
+    tool_workers = None
+    if args.pipeline:
+        tool_workers = {
+            TOOL_PRESIDIO: args.presidio_workers,
+            TOOL_SPACY: args.spacy_workers,
+            TOOL_STANFORD_NER: args.stanford_workers,
+        }
+
     start_time = datetime.now()  # record start time and later, the end time
 
     hearing_text_into_annotations(create_annotation_output_file=True,
                                   insert_labels_in_text=True,
                                   write_statistics=True,
-                                  ignore_1st_page_info=ignore_1st_page)
+                                  ignore_1st_page_info=ignore_1st_page,
+                                  workers=args.workers,
+                                  tool_workers=tool_workers,
+                                  use_cache=not args.no_cache,
+                                  reclean=args.reclean,
+                                  resume=args.resume,
+                                  preload_models=args.preload,
+                                  shard_transcripts=args.shard)
+
+    # output how long each model took to load and how many times it was reused
+    ModelManager.print_model_report()
 
     # output start time and end time
     print(f"\nStarted at: {start_time.strftime('%d.%m.%Y %H:%M:%S')}")
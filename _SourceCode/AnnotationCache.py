@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+from importlib import metadata
+
+from _SourceCode import Constants
+from _SourceCode.ModelClasses.FileAnnotations import file_annotations_from_dict
+
+"""
+Content-addressed cache of the annotations of the hearing files.
+The key of a file is the hash of its text combined with a fingerprint of everything that can change the annotations:
+the versions of the tools, the models, the recognizer patterns and cleaning code, and the configuration
+(thresholds, labels...). A file whose key is in the cache reuses the stored annotations without running the NER tools,
+and 2 transcripts with the same text under different names are only annotated once.
+Changing the code or the configuration changes the fingerprint, so the stale entries are simply not found anymore.
+
+The raw (unfiltered) results of each tool are also kept per transcript, under a key that only depends on what changes
+the output of the models (not on the filtering and cleaning code):
+    presidio: [start, end, entity_type, score]
+    spacy: [start, end, label]
+    stanford: [start, end, label] of the tokens that aren't tagged 'O'
+so that a change in the filtering or cleaning only replays those steps instead of running the models again.
+"""
+
+# bump when the way the raw results are produced changes (get_presidio_raw_results, get_spacy_raw_results_batch...)
+RAW_RESULTS_FORMAT_VERSION = 1
+
+# modules whose code filters and cleans the raw results of the tools (the modules of the tools, which also clean their
+# results, are in _raw_results_source_files, which is part of the pipeline fingerprint)
+_annotation_source_files = [
+    'AnnotationUtils.py',
+    'HelperFunctions.py',
+    os.path.join('AnnotationHelpers', 'AnnotationChecker.py'),
+    os.path.join('AnnotationHelpers', 'AnnotationCleaner.py'),
+    os.path.join('ModelClasses', 'Annotation.py'),
+]
+
+# modules whose code changes the raw results of the tools
+_raw_results_source_files = [
+    'TranscriptSharding.py',
+    os.path.join('FileDataExtraction', 'FirstPageNamesExtraction.py'),
+    os.path.join('FileDataExtraction', 'TextExtraction.py'),
+    os.path.join('ToolsUtils', 'PresidioRecognizers.py'),
+    os.path.join('ToolsUtils', 'PresidioUtils.py'),
+    os.path.join('ToolsUtils', 'SpaCyUtils.py'),
+    os.path.join('ToolsUtils', 'StanfordNER.py'),
+    os.path.join('ToolsUtils', 'StanfordNERServer.py'),
+    os.path.join('ToolsUtils', 'TextChunking.py'),
+]
+
+_packages = ['presidio_analyzer', 'spacy', 'nltk', Constants.spacy_model]
+
+_raw_results_fingerprints = {}  # ignore_1st_page_info -> fingerprint, computed once per process
+
+
+def get_pipeline_fingerprint(ignore_1st_page_info):
+    """
+    Hash of the versions, models, code and configuration used to annotate the files.
+    It includes the fingerprint of the raw results, plus the code and configuration of the filtering and cleaning.
+    """
+    return _get_fingerprint(_annotation_source_files, {
+        'raw_results': get_raw_results_fingerprint(ignore_1st_page_info),
+        'spacy_labels': Constants.spacy_labels,
+    })
+
+
+def get_raw_results_fingerprint(ignore_1st_page_info):
+    """
+    Hash of the versions, models, code and configuration that change the raw results of the tools
+    """
+    if ignore_1st_page_info not in _raw_results_fingerprints:
+        _raw_results_fingerprints[ignore_1st_page_info] = _get_fingerprint(_raw_results_source_files, {
+            'format_version': RAW_RESULTS_FORMAT_VERSION,
+            'versions': {package: _get_package_version(package) for package in _packages},
+            'stanford_ner': {
+                'jar': _get_file_signature(Constants.stanford_ner_jar),
+                'model': _get_file_signature(Constants.stanford_ner_model),
+            },
+            'spacy_model': Constants.spacy_model,
+            'spacy_disabled_components': Constants.spacy_disabled_components,
+            'spacy_split_utterances': Constants.spacy_split_utterances,
+            'presidio_labels': Constants.presidio_labels,
+            'presidio_threshold': Constants.presidio_threshold,
+            'chunk_max_size': Constants.chunk_max_size,
+            'chunk_overlap': Constants.chunk_overlap,
+            'id_patterns': Constants.id_patterns,
+            'spelled_out_name_pattern': Constants.spelled_out_name_pattern,
+            'first_page_names_headers': Constants.first_page_names_headers,
+            'ignore_1st_page_info': ignore_1st_page_info,
+        })
+    return _raw_results_fingerprints[ignore_1st_page_info]
+
+
+def _get_fingerprint(source_files, config):
+    """
+    Hash of the code of the source files and of the configuration
+    """
+    source_directory = os.path.dirname(os.path.abspath(__file__))
+    source_hashes = {}
+    for source_file in source_files:
+        with open(os.path.join(source_directory, source_file), 'rb') as f:
+            source_hashes[source_file] = hashlib.sha256(f.read()).hexdigest()
+
+    fingerprint = {'config': config, 'sources': source_hashes}
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_cache_key(text, fingerprint):
+    """
+    Key of a transcript: hash of its (normalized) text and of the pipeline fingerprint
+    """
+    text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    return hashlib.sha256(f'{fingerprint}|{text_hash}'.encode('utf-8')).hexdigest()
+
+
+def load_cached_annotations(key):
+    """
+    Return the cached data of the key or None if it's not in the cache
+    """
+    cache_file = _get_cache_file_path(key)
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"WARNING: the cache entry {cache_file} can't be read, the file will be annotated again.")
+        return None
+
+
+def save_cached_annotations(key, file_annotations):
+    """
+    Store the annotations of a file under its key
+    """
+    _write_json_file(_get_cache_file_path(key), file_annotations.to_dict())
+
+
+def load_raw_results(text, ignore_1st_page_info):
+    """
+    Return the raw results of each tool for the text ({tool: raw results}) or None if they are not in the cache
+    """
+    raw_results_file = _get_raw_results_file_path(text, ignore_1st_page_info)
+    if not os.path.exists(raw_results_file):
+        return None
+    try:
+        with open(raw_results_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"WARNING: the raw results {raw_results_file} can't be read.")
+        return None
+
+
+def save_raw_results(text, ignore_1st_page_info, tool_results):
+    """
+    Store the raw results of each tool for the text ({tool: raw results})
+    """
+    _write_json_file(_get_raw_results_file_path(text, ignore_1st_page_info), tool_results)
+
+
+def file_annotations_from_cache(file, cached_data):
+    """
+    Rebuild the FileAnnotations of a file from the cached data
+    (the cached data can come from another file that has the same text)
+    """
+    return file_annotations_from_dict(cached_data, file=file)
+
+
+def _get_cache_file_path(key):
+    return os.path.join(Constants.annotation_cache_directory, key + '.json')
+
+
+def _get_raw_results_file_path(text, ignore_1st_page_info):
+    key = get_cache_key(text, get_raw_results_fingerprint(ignore_1st_page_info))
+    return os.path.join(Constants.raw_results_cache_directory, key + '.json')
+
+
+def _write_json_file(file_path, data):
+    """
+    Write in a temporary file first so that an interrupted run never leaves half an entry.
+    Also safe when several processes write in the cache at the same time.
+    """
+    directory = os.path.dirname(file_path)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    temp_file = f'{file_path}.{os.getpid()}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp_file, file_path)
+
+
+def _get_package_version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def _get_file_signature(file_path):
+    """
+    Name and size of a model file, hashing the whole file every run would take too long
+    """
+    if not os.path.exists(file_path):
+        return os.path.basename(file_path)
+    return f'{os.path.basename(file_path)}:{os.path.getsize(file_path)}'
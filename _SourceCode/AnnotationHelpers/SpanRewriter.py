@@ -0,0 +1,67 @@
+import os
+
+"""
+Rewrite the spans of a text in a single pass.
+An edit is a (start, end, replacement) tuple: text[start:end] is replaced by the replacement.
+The edits are sorted once and the output is made of the segments between them (the untouched parts of the text and
+the replacements), so the text is copied once no matter the number of edits. The segments are written straight into a
+file without building the whole output in memory.
+Edits that overlap an edit that starts before them would shift the positions of each other: they are not applied and
+are reported instead.
+"""
+
+
+def write_rewritten_spans(file, text, edits, description=''):
+    """
+    Apply the edits to the text and write the output directly into the file, one segment at a time
+    """
+    directory = os.path.dirname(file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(file, 'w', encoding='utf-8') as text_file:
+        text_file.writelines(get_segments(text, edits, description))
+
+
+def get_segments(text, edits, description=''):
+    """
+    Yield the segments of the output in order: the text between the edits and the replacements
+    """
+    sorted_edits, rejected_edits = sort_edits(edits)
+    if rejected_edits:
+        report_rejected_edits(text, rejected_edits, description)
+
+    position = 0
+    for start, end, replacement in sorted_edits:
+        yield text[position:start]
+        yield replacement
+        position = end
+    yield text[position:]
+
+
+def sort_edits(edits):
+    """
+    Sort the edits by position.
+    Returns the edits to apply and the ones that can't be applied: they overlap an edit that starts before them
+    (or that has the same start and comes first) or they end before they start.
+    """
+    sorted_edits = []
+    rejected_edits = []
+    last_end = 0
+    for start, end, replacement in sorted(((int(s), int(e), r) for s, e, r in edits), key=lambda x: x[0]):
+        if end < start or start < last_end:
+            rejected_edits.append((start, end, replacement))
+            continue
+        sorted_edits.append((start, end, replacement))
+        last_end = end
+    return sorted_edits, rejected_edits
+
+
+def report_rejected_edits(text, rejected_edits, description=''):
+    """
+    Print the edits that were not applied
+    """
+    where = f' in {description}' if description else ''
+    print(f'WARNING: {len(rejected_edits)} overlapping edit(s) not applied{where}:')
+    for start, end, replacement in rejected_edits:
+        print(f'    start: {start}\t end: {end}\t text: {text[start:end]!r} ➡ {replacement!r}')
@@ -1,14 +1,16 @@
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 import _SourceCode.Constants as Constants
-from _SourceCode import WriteToFiles, JsonFunctions
+from _SourceCode import WriteToFiles, JsonFunctions, AnnotationCache, RunJournal
 from _SourceCode.AnnotationHelpers import AnnotationCleaner
-from _SourceCode.AnnotationHelpers.AnnotationReplace import annotate_text
+from _SourceCode.AnnotationHelpers.AnnotationReplace import write_annotated_text
 from _SourceCode.FileDataExtraction.TextExtraction import extract_text_from_txt_file
-from _SourceCode.ToolsUtils.PresidioUtils import get_presidio_annotations
-from _SourceCode.ToolsUtils.SpaCyUtils import get_spacy_annotations
-from _SourceCode.ToolsUtils.StanfordNER import StanfordNER
+from _SourceCode.ModelClasses.FileAnnotations import FileAnnotations
+from _SourceCode.ToolsUtils.PresidioUtils import get_presidio_raw_results, get_presidio_annotations_from_raw_results, \
+    PRESIDIO_ANALYZER
+from _SourceCode.ToolsUtils.SpaCyUtils import get_spacy_raw_results_batch, get_spacy_annotations_from_raw_results
+from _SourceCode.ToolsUtils.StanfordNER import StanfordNER, STANFORD_NER_SERVER
 from _SourceCode.WriteToFiles import prepare_write_statistics_into_file
 
 """
@@ -27,12 +29,29 @@ annotation_statistics = {
 
 skip_1st_page_info_presidio = False
 
+TOOL_PRESIDIO = 'presidio'
+TOOL_SPACY = 'spacy'
+TOOL_STANFORD_NER = 'stanford'
+tools = [TOOL_PRESIDIO, TOOL_SPACY, TOOL_STANFORD_NER]  # the results are always combined in this order
+tool_models = {  # model used by each tool (see ModelManager)
+    TOOL_PRESIDIO: PRESIDIO_ANALYZER,
+    TOOL_SPACY: Constants.spacy_model,
+    TOOL_STANFORD_NER: STANFORD_NER_SERVER,
+}
+
 
 def hearing_text_into_annotations(
         create_annotation_output_file=False,
         insert_labels_in_text=True,
         write_statistics=False,
-        ignore_1st_page_info=False):
+        ignore_1st_page_info=False,
+        workers=1,
+        tool_workers=None,
+        use_cache=True,
+        reclean=False,
+        resume=False,
+        preload_models=False,
+        shard_transcripts=False):
     """
     Takes the txt files in the hearings_txt folder, gets the annotations,
     cleans them and writes them into files. Process files in batches.
@@ -44,16 +63,27 @@ def hearing_text_into_annotations(
     @param write_statistics     Write the filtered out annotations in a file
     @param ignore_1st_page_info  If true, stop extracting information from the transcripts' first
                             pages and they won't be fed into Presidio.
+    @param workers  Number of processes annotating the files. Each process keeps its own models loaded
+                    and takes the next file as soon as it's done with the previous one.
+    @param tool_workers  If given, use a pipeline with dedicated processes for each NER tool instead.
+                         Dict with the number of processes of each tool, e.g. {'presidio': 1, 'spacy': 2, 'stanford': 1}
+    @param use_cache  Reuse the cached annotations of the files that didn't change since they were annotated.
+                      If false, every file is annotated again (files with the same text are still only annotated once).
+                      Files that changed only get their raw tool results filtered and cleaned again if those are cached.
+    @param reclean  Don't run the NER tools at all: filter and clean the cached raw results of every file again.
+                    Files without cached raw results are skipped.
+    @param resume  Continue the previous run that was stopped: the files in its journal are not processed again
+                   and their statistics are taken from the journal.
+    @param preload_models  With workers > 1, load the read-only models once in the main process and fork the workers,
+                           which share them instead of each loading its own copy (see ParallelAnnotation.py).
+    @param shard_transcripts  With workers > 1, split the transcripts longer than shard_min_size into shards
+                              annotated by several workers (see TranscriptSharding.py).
     """
 
     global annotation_statistics, skip_1st_page_info_presidio
 
     skip_1st_page_info_presidio = ignore_1st_page_info
 
-    import nltk
-    print("Downloading pacakge for StanfordNER.\n")
-    nltk.download('punkt')  # This is for StanfordNER
-
     annotation_statistics = {
         "files_count": 0,  # counter for console output
         "total_filtered_out_annotations_from_final_cleaning": [],
@@ -75,16 +105,134 @@ def hearing_text_into_annotations(
     print('\n')
     print('---------GATHERING ANNOTATIONS---------')
 
+    # only annotate the files that are not in the cache, and only once for files that have the same text.
+    # files whose raw tool results are cached only go through the filtering and cleaning again.
+    # the cache entries are read here, so that a file whose entry is broken is annotated with the others (after the
+    # models are prepared) or skipped with --reclean, which never runs the NER tools
+    fingerprint = AnnotationCache.get_pipeline_fingerprint(ignore_1st_page_info)
+    cache_keys = {}  # file name without the format -> cache key
+    files_to_annotate = []
+    files_to_reclean = []
+    files_to_reuse = []
+    files_skipped = []
+    files_finished = []  # FileAnnotations of the files finished by the run that is resumed
+    keys_seen = set()
+
+    # the files in the journal of the stopped run are done, unless they changed since
+    finished_files = RunJournal.resume_journal() if resume else {}
+    if not resume:
+        RunJournal.start_new_journal()
+
     for file in files:
-        annotations = _annotations_for_file(
+        text = extract_text_from_txt_file(file)
+        key = AnnotationCache.get_cache_key(text, fingerprint)
+        finished_key, finished_file_annotations = finished_files.get(file.replace(Constants.text_format, ''),
+                                                                     (None, None))
+        if finished_key == key:
+            files_finished.append(finished_file_annotations)
+        elif reclean:
+            if AnnotationCache.load_raw_results(text, ignore_1st_page_info) is not None:
+                files_to_reclean.append(file)
+            else:
+                files_skipped.append(file)
+        elif key in keys_seen or (use_cache and AnnotationCache.load_cached_annotations(key) is not None):
+            files_to_reuse.append(file)
+        elif use_cache and AnnotationCache.load_raw_results(text, ignore_1st_page_info) is not None:
+            files_to_reclean.append(file)
+        else:
+            files_to_annotate.append(file)
+        keys_seen.add(key)
+        cache_keys[file.replace(Constants.text_format, '')] = key
+
+    if resume:
+        print(f"Resuming the previous run: {len(files_finished)} files already done.")
+    print(f"{len(files_to_annotate)} files to annotate, "
+          f"{len(files_to_reclean)} files to clean again from the cached raw results of the tools, "
+          f"{len(files_to_reuse)} files reused from the cache or identical to another file.\n")
+    if files_skipped:
+        print(f"{len(files_skipped)} files skipped because the raw results of the tools are not cached "
+              f"(or can't be read), run without --reclean first: {', '.join(files_skipped)}\n")
+
+    if files_to_annotate:
+        import nltk
+        print("Downloading pacakge for StanfordNER.\n")
+        nltk.download('punkt')  # This is for StanfordNER
+
+    files = files_to_annotate
+
+    # their annotations are already in the json file, only their statistics are needed
+    for file_annotations in files_finished:
+        _record_file_annotations(file_annotations, write_statistics, write_json=False)
+
+    if tool_workers:
+        from _SourceCode import ToolPipeline
+        all_file_annotations = ToolPipeline.annotate_files_with_tool_pipeline(
+            files=files,
+            directory=directory,
+            tool_workers=tool_workers,
+            ignore_1st_page_info=ignore_1st_page_info,
+            create_annotation_output_file=create_annotation_output_file,
+            insert_labels_in_text=insert_labels_in_text,
+            write_statistics=write_statistics)
+    elif workers > 1:
+        from _SourceCode import ParallelAnnotation
+        all_file_annotations = ParallelAnnotation.annotate_files_in_processes(
+            files=files,
+            directory=directory,
+            workers=workers,
+            ignore_1st_page_info=ignore_1st_page_info,
+            create_annotation_output_file=create_annotation_output_file,
+            insert_labels_in_text=insert_labels_in_text,
+            write_statistics=write_statistics,
+            preload_models=preload_models,
+            shard_transcripts=shard_transcripts)
+    else:
+        all_file_annotations = (_annotations_for_file(
+            file=file,
+            file_number=index + 1,
+            directory=directory,
+            create_annotation_output_file=create_annotation_output_file,
+            insert_labels_in_text=insert_labels_in_text,
+            write_statistics=write_statistics) for index, file in enumerate(files))
+
+    for file_annotations in all_file_annotations:
+        AnnotationCache.save_cached_annotations(cache_keys[file_annotations.file], file_annotations)
+        _record_file_annotations(file_annotations, write_statistics)
+        RunJournal.record_file(cache_keys[file_annotations.file], file_annotations)
+
+    # replay the filtering and the cleaning on the cached raw results of the tools
+    for index, file in enumerate(files_to_reclean):
+        file_annotations = _annotations_from_raw_results(
+            file=file,
+            file_number=len(files) + index + 1,
+            directory=directory,
+            create_annotation_output_file=create_annotation_output_file,
+            insert_labels_in_text=insert_labels_in_text,
+            write_statistics=write_statistics)
+        if file_annotations is None:
+            continue
+        AnnotationCache.save_cached_annotations(cache_keys[file_annotations.file], file_annotations)
+        _record_file_annotations(file_annotations, write_statistics)
+        RunJournal.record_file(cache_keys[file_annotations.file], file_annotations)
+
+    # the other files get their annotations from the cache
+    for index, file in enumerate(files_to_reuse):
+        file_annotations = _annotations_from_cache(
             file=file,
+            file_number=len(files) + len(files_to_reclean) + index + 1,
             directory=directory,
+            cache_key=cache_keys[file.replace(Constants.text_format, '')],
             create_annotation_output_file=create_annotation_output_file,
             insert_labels_in_text=insert_labels_in_text,
             write_statistics=write_statistics)
-        annotation_statistics['files_count'] += 1
-        # place the annotation data into a json file
-        JsonFunctions.write_data_to_json(annotations)
+        if file_annotations is None:
+            continue
+        _record_file_annotations(file_annotations, write_statistics)
+        RunJournal.record_file(cache_keys[file_annotations.file], file_annotations)
+
+    # write the legacy json file with the annotations of every transcript from the append-only store
+    if JsonFunctions.annotation_data_exists():
+        JsonFunctions.compact_annotation_store()
 
     # write a separate file containing the number of correct and incorrect annotations as well as the average of all files
     if write_statistics and annotation_statistics["total_annotation_count"] and annotation_statistics[
@@ -94,33 +242,136 @@ def hearing_text_into_annotations(
     return annotations_json
 
 
-def _annotations_for_file(file, directory, create_annotation_output_file, insert_labels_in_text, write_statistics):
+def _record_file_annotations(file_annotations, write_statistics, write_json=True):
+    """
+    Add the result of a single file to the json file and to the statistics of all files
+    """
+    annotation_statistics['files_count'] += 1
+    annotation_statistics['total_unfiltered_annotations_count'].append(file_annotations.total_unfiltered_annotations)
+    annotation_statistics['total_filtered_out_annotations_from_final_cleaning'].extend(
+        file_annotations.filtered_out_annotations)
+
+    if write_statistics:
+        annotation_statistics['correct_annotations'].extend(file_annotations.unique_annotations)
+        annotation_statistics['total_annotation_count'].append(len(file_annotations.unique_annotations))
+        annotation_statistics['total_false_annotation_count'].append(len(file_annotations.false_annotations))
+        annotation_statistics['total_false_annotations'].extend(file_annotations.false_annotations)
+
+    # place the annotation data into a json file
+    if write_json:
+        JsonFunctions.write_data_to_json(file_annotations.to_json_data())
+
+
+def _annotations_for_file(file, file_number, directory, create_annotation_output_file, insert_labels_in_text,
+                          write_statistics):
     """
     Process a single file. Extracts annotations, cleans them, and performs necessary post-processing.
     This is the function that gets called concurrently.
+    file_number is only used for the console output.
     """
 
     file_path = os.path.join(directory, file)
-    file_name_no_format = file.replace(Constants.text_format, '')
     text = extract_text_from_txt_file(file)
 
-    print(annotation_statistics['files_count'] + 1, "----", f"\rProcessing: {file_path}...\n")
+    print(file_number, "----", f"\rProcessing: {file_path}...\n")
+
+    # Get the raw results from all NER tools and keep them to be able to clean them again later
+    tool_results = _get_tool_results(text)
+    AnnotationCache.save_raw_results(text, skip_1st_page_info_presidio, tool_results)
+
+    return _annotations_from_tool_results(
+        file=file,
+        file_number=file_number,
+        directory=directory,
+        text=text,
+        tool_results=tool_results,
+        create_annotation_output_file=create_annotation_output_file,
+        insert_labels_in_text=insert_labels_in_text,
+        write_statistics=write_statistics)
+
+
+def _annotations_from_raw_results(file, file_number, directory, create_annotation_output_file, insert_labels_in_text,
+                                  write_statistics):
+    """
+    Process a single file with the raw results of the tools stored in the cache: only the filtering, merging and
+    cleaning steps are done again, without running the NER tools.
+    Returns None if the cache entry can't be read anymore, the file then needs a full run.
+    """
+    file_path = os.path.join(directory, file)
+    text = extract_text_from_txt_file(file)
+    tool_results = AnnotationCache.load_raw_results(text, skip_1st_page_info_presidio)
+    if tool_results is None:  # the cache entry was removed or broken since the files were sorted
+        print(file_number, "----", f"\rSkipping {file_path}: its raw results can't be read, run again without "
+                                   f"--reclean to annotate it.\n")
+        return None
+
+    print(file_number, "----", f"\rCleaning the cached raw results of: {file_path}...\n")
+    return _annotations_from_tool_results(
+        file=file,
+        file_number=file_number,
+        directory=directory,
+        text=text,
+        tool_results=tool_results,
+        create_annotation_output_file=create_annotation_output_file,
+        insert_labels_in_text=insert_labels_in_text,
+        write_statistics=write_statistics)
 
-    # Get combined annotations from all NER tools
-    annotations, false_annotations, total_unfiltered_annotations = _get_combined_annotations(text)
+
+def _annotations_from_cache(file, file_number, directory, cache_key, create_annotation_output_file,
+                            insert_labels_in_text, write_statistics):
+    """
+    Process a single file with the annotations stored in the cache, without running the NER tools.
+    The output files are written the same way as for a file that was just annotated.
+    Returns None if the cache entry can't be read anymore, the file then needs a full run.
+    """
+    file_path = os.path.join(directory, file)
+    cached_data = AnnotationCache.load_cached_annotations(cache_key)
+    if cached_data is None:  # the cache entry was removed or broken since the files were sorted
+        print(file_number, "----", f"\rSkipping {file_path}: its cached annotations can't be read, run again to "
+                                   f"annotate it.\n")
+        return None
+
+    file_name_no_format = file.replace(Constants.text_format, '')
+    print(file_number, "----", f"\rReusing the cached annotations of: {file_path}...\n")
+
+    file_annotations = AnnotationCache.file_annotations_from_cache(file_name_no_format, cached_data)
+    _file_post_processing(
+        create_annotation_output_file=create_annotation_output_file,
+        insert_labels_in_text=insert_labels_in_text,
+        write_statistics=write_statistics,
+        file_number=file_number,
+        file_path=file_path,
+        file_name_no_format=file_name_no_format,
+        unique_annotations=file_annotations.unique_annotations,
+        false_annotations=file_annotations.false_annotations,
+        text=extract_text_from_txt_file(file)
+    )
+
+    print('\n')
+    return file_annotations
+
+
+def _annotations_from_tool_results(file, file_number, directory, text, tool_results, create_annotation_output_file,
+                                   insert_labels_in_text, write_statistics):
+    """
+    Filter and combine the raw results of the NER tools for a single file, clean them and perform the post-processing
+    """
+    file_path = os.path.join(directory, file)
+    file_name_no_format = file.replace(Constants.text_format, '')
+
+    # Combine the annotations from all NER tools
+    annotations, false_annotations, total_unfiltered_annotations = _combine_tool_results(text, tool_results)
 
     # Clean the annotations
     unique_annotations, filtered_out_annotations = AnnotationCleaner.handle_duplicates_overlaps(annotations)
 
     unique_annotations.sort(key=lambda x: int(x.start))
 
-    annotation_statistics['total_unfiltered_annotations_count'].append(total_unfiltered_annotations)
-    annotation_statistics['total_filtered_out_annotations_from_final_cleaning'].extend(filtered_out_annotations)
-
     _file_post_processing(
         create_annotation_output_file=create_annotation_output_file,
         insert_labels_in_text=insert_labels_in_text,
         write_statistics=write_statistics,
+        file_number=file_number,
         file_path=file_path,
         file_name_no_format=file_name_no_format,
         unique_annotations=unique_annotations,
@@ -131,33 +382,67 @@ def _annotations_for_file(file, directory, create_annotation_output_file, insert
     print('\n')
 
     # Return file annotations for final collection
-    return {
-        'file': file_name_no_format.replace(Constants.text_format, ''),
-        'annotations': [ann.to_dict() for ann in unique_annotations],
-    }
+    return FileAnnotations(
+        file=file_name_no_format.replace(Constants.text_format, ''),
+        unique_annotations=unique_annotations,
+        false_annotations=false_annotations,
+        filtered_out_annotations=filtered_out_annotations,
+        total_unfiltered_annotations=total_unfiltered_annotations
+    )
 
 
-def _get_combined_annotations(text):
-    # return
+def run_tool(tool, text, text_range=None):
     """
-    Get annotations from the tools and combine them in one list
+    Get the raw (unfiltered) results of a single NER tool, see AnnotationCache for their format.
+    With text_range (start, end), only the results of that shard of the text (see TranscriptSharding.py).
+    """
+    if tool == TOOL_PRESIDIO:
+        return get_presidio_raw_results(text, skip_1st_page_info_presidio, text_range)
+    if tool == TOOL_SPACY:
+        return get_spacy_raw_results_batch([text], [text_range])[0]
+    if tool == TOOL_STANFORD_NER:
+        return StanfordNER().get_stanford_ner_raw_results_batch([text], [text_range])[0]
+    raise ValueError(f"Unknown NER tool '{tool}'")
+
+
+def clean_tool_results(tool, text, raw_results):
+    """
+    Filter and clean the raw results of a single NER tool.
+    Returns the annotations, the false annotations and the # of unfiltered annotations
+    """
+    if tool == TOOL_PRESIDIO:
+        return get_presidio_annotations_from_raw_results(text, raw_results)
+    if tool == TOOL_SPACY:
+        return get_spacy_annotations_from_raw_results(text, raw_results)
+    if tool == TOOL_STANFORD_NER:
+        return StanfordNER().get_stanford_ner_annotations_from_raw_results(text, raw_results)
+    raise ValueError(f"Unknown NER tool '{tool}'")
+
+
+def _get_tool_results(text, text_range=None):
+    """
+    Run the NER tools on the text (or a shard of it) at the same time and return the raw results of each tool
     """
-    inner_total_unfiltered_annotations_count = 0
     with ThreadPoolExecutor() as executor:
-        futures = {
-            executor.submit(get_presidio_annotations, text, skip_1st_page_info_presidio): 'presidio',
-            executor.submit(get_spacy_annotations, text): 'spacy',
-            executor.submit(StanfordNER().get_stanford_ner_annotations, text): 'stanford'
-        }
+        futures = {tool: executor.submit(run_tool, tool, text, text_range) for tool in tools}
+        return {tool: future.result() for tool, future in futures.items()}
 
-        combined_annotations = []
-        false_annotations = []
 
-        for future in as_completed(futures):
-            annotations, false_anns, total_unfiltered_annotations = future.result()
-            inner_total_unfiltered_annotations_count += total_unfiltered_annotations
-            combined_annotations.extend(annotations)
-            false_annotations.extend(false_anns)
+def _combine_tool_results(text, tool_results):
+    """
+    Filter the raw results of each tool and combine the annotations of the tools in one list
+    """
+    inner_total_unfiltered_annotations_count = 0
+    combined_annotations = []
+    false_annotations = []
+
+    # combine the results in the same tool order every time so that the cleaning gives the same output
+    # no matter which tool finished first
+    for tool in tools:
+        annotations, false_anns, total_unfiltered_annotations = clean_tool_results(tool, text, tool_results[tool])
+        inner_total_unfiltered_annotations_count += total_unfiltered_annotations
+        combined_annotations.extend(annotations)
+        false_annotations.extend(false_anns)
 
     combined_annotations.sort(key=lambda x: x.start)
     false_annotations.extend([item for item in combined_annotations if not item.preview])
@@ -169,6 +454,7 @@ def _file_post_processing(
         create_annotation_output_file,
         insert_labels_in_text,
         write_statistics,
+        file_number,
         file_path,
         file_name_no_format,
         unique_annotations,
@@ -182,15 +468,13 @@ def _file_post_processing(
         annotation_file_name = file_name_no_format + '_ANNOTATIONS.txt'
         output_file_path = os.path.join(Constants.annotations_dir, annotation_file_name)
         WriteToFiles.write_annotations_into_file(output_file_path, unique_annotations)
-        print(annotation_statistics['files_count'] + 1, "----", len(unique_annotations), "annotations written in",
-              output_file_path)
+        print(file_number, "----", len(unique_annotations), "annotations written in", output_file_path)
 
-    print(annotation_statistics['files_count'] + 1, "----", f"\rProcessed: {file_path}...")
+    print(file_number, "----", f"\rProcessed: {file_path}...")
 
     if insert_labels_in_text:  # insert the labels into a copy of the transcript file for review
-        annotated_text = annotate_text(text, unique_annotations)
         file = os.path.join(Constants.annotations_dir, file_name_no_format + Constants.text_format)
-        WriteToFiles.write_text_into_file(file, annotated_text)
+        write_annotated_text(file, text, unique_annotations)
         print("Labels inserted in ", file)
 
     unique_annotations.sort(key=lambda x: int(x.start))
@@ -198,8 +482,3 @@ def _file_post_processing(
     if write_statistics:
         stat_file = prepare_write_statistics_into_file(file_name_no_format, unique_annotations, false_annotations)
         print("Statistics written in ", stat_file)
-
-        annotation_statistics['correct_annotations'].extend(unique_annotations)
-        annotation_statistics['total_annotation_count'].append(len(unique_annotations))
-        annotation_statistics['total_false_annotation_count'].append(len(false_annotations))
-        annotation_statistics['total_false_annotations'].extend(false_annotations)
@@ -1,55 +1,105 @@
+import functools
 import os
+import time
 
 from _SourceCode import Constants
 from _SourceCode.Anonymization import Pseudonymization
-from _SourceCode.JsonFunctions import get_data_from_annotation_json
+from _SourceCode.Anonymization.pseudonymization_methods.Location_Pseudonymization import location_labels, \
+    get_locations_to_classify
+from _SourceCode.Anonymization.pseudonymization_methods.NRP_Pseudonymization import nrp_types, get_nrps_to_classify
+from _SourceCode.JsonFunctions import get_annotation_index, read_annotation_record, get_annotation_store_path, \
+    annotation_data_exists
 from _SourceCode.ModelClasses.Annotation import Annotation
+from _SourceCode.ToolsUtils import Classifier, Gazetteer, ModelManager
 
 
-def anonymization_entry_point():
+def anonymization_entry_point(workers=1):
     """
-    Entry point for anonymization 
+    Entry point for anonymization
+    workers - number of processes pseudonymizing the files
     """
+    start_time = time.perf_counter()
 
-    # Get the json file and the data inside of it
-    json_file = os.path.join(Constants.output_json_directory, Constants.output_json_file)
+    # Get the annotation store (or the legacy json file) and the data inside of it
+    json_file = get_annotation_store_path()
 
-    if not os.path.exists(json_file):
+    if not annotation_data_exists():
         print(f'The file {json_file} does not exist. Please run GatherAnnotations.py.')
         return
 
-    json_data = convert_dict_to_annotation(get_data_from_annotation_json())
-
-    if json_data is None:
-        print(f'The file {json_file} does not have any data. Cannot proceed.')
-        return
+    # index of the annotation store (file -> position of its annotations), read or built once
+    annotation_index = get_annotation_index()
 
     output_directory = Constants.output_anonymization + Constants.PSEUDONYMIZATION
     if not os.path.exists(output_directory):
         os.makedirs(output_directory)
 
+    # classify the locations and NRPs of all the transcripts in batches before pseudonymizing them
+    prefetch_classifications(annotation_index)
+    print(f"Ready to pseudonymize after {time.perf_counter() - start_time:.2f} seconds")
+
     # Call the appropriate Pseudonymization method
-    Pseudonymization.anonymize(output_directory, json_data)
+    Pseudonymization.anonymize(output_directory, functools.partial(get_file_annotations, annotation_index), workers)
+
+    Classifier.print_classification_report()
+    ModelManager.print_model_report()
+
+
+def prefetch_classifications(annotation_index):
+    """
+    Send the LOCATION and NRP values of all the transcripts in the hearings folder through the zero shot model at once
+    (in batches, only the values that aren't in the gazetteer or in the classification cache yet). The
+    pseudonymization of each file then finds its classifications in memory (also in the worker processes, which start
+    after this) or in the cache.
+    """
+    hearing_files = set(os.listdir(Constants.hearings_txt_directory))
+    locations = {}
+    nrps = {}
+    for file, offset in annotation_index.items():
+        if file + Constants.text_format not in hearing_files:
+            continue
+        for item in read_annotation_record(offset)['annotations']:
+            preview = item['preview'].strip()
+            if item['label'] == Constants.LABEL_LOCATION and preview:
+                locations[preview] = None
+            elif item['label'] == Constants.LABEL_NRP and preview:
+                nrps[preview] = None
+
+    # the locations found in the gazetteer don't need the model
+    locations_to_classify = get_locations_to_classify(list(locations))
+    Gazetteer.print_gazetteer_report()
+    if not Classifier.is_classifier_available():
+        return
+
+    print(f"Classifying {len(locations_to_classify)} locations and {len(nrps)} NRPs...")
+    Classifier.prefetch_classifications(locations_to_classify, location_labels)
+    Classifier.prefetch_classifications(get_nrps_to_classify(list(nrps)), nrp_types)
 
 
-def convert_dict_to_annotation(json_data):
+def get_file_annotations(annotation_index, hearing_text_file):
     """
-    Convert json data to Annotation data and return it as list of Annotation data with the file name
+    Read and convert the annotations of a single file, None if the file has no annotations
     """
-    output = []
+    offset = annotation_index.get(hearing_text_file[:-len(Constants.text_format)])
+    if offset is None:
+        return None
+    return convert_dict_to_annotation(read_annotation_record(offset))
 
-    for data in json_data:
-        file = data['file'] + Constants.text_format
-        annotations_dict = data['annotations']
-        annotations_list = [Annotation(
-            start=item['start'],
-            end=item['end'],
-            label=item['label'],
-            preview=item['preview'],
-            source=item['source']) for item in annotations_dict]
 
-        output.append({
-            'file': file,
-            'annotations': annotations_list
-        })
-    return output
+def convert_dict_to_annotation(data):
+    """
+    Convert the json data of a file to Annotation data and return the Annotation data with the file name
+    """
+    file = data['file'] + Constants.text_format
+    annotations_dict = data['annotations']
+    annotations_list = [Annotation(
+        start=item['start'],
+        end=item['end'],
+        label=item['label'],
+        preview=item['preview'],
+        source=item['source']) for item in annotations_dict]
+
+    return {
+        'file': file,
+        'annotations': annotations_list
+    }
@@ -1,38 +1,20 @@
+import gc
+import multiprocessing
 import os
 import re
 
 from dateutil import parser
 
 from _SourceCode import Constants, WriteToFiles, HelperFunctions
-from _SourceCode.AnnotationHelpers.AnnotationReplace import insert_into_annotations
-from _SourceCode.Anonymization.pseudonymization_methods.Age_Pseudonymization import pseudonymize_age_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Date_Pseudonymization import pseudonymize_date_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Email_Pseudonymization import pseudonymize_email_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Height_Pseudonymization import pseudonymize_height_labels
-from _SourceCode.Anonymization.pseudonymization_methods.ID_Pseudonymization import pseudonymize_id_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Location_Pseudonymization import pseudonymize_location_labels
-from _SourceCode.Anonymization.pseudonymization_methods.NRP_Pseudonymization import pseudonymize_nrp_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Organization_Pseudonymization import \
-    pseudonymize_organization_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Person_Pseudonymization import pseudonymize_person_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Phone_Number_Pseudonymization import \
-    pseudonymize_phone_number_labels
-from _SourceCode.Anonymization.pseudonymization_methods.SpelledOutItems_Pseudonymization import \
-    pseudonymize_spelled_out_items_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Spelled_Name_Pseudonymization import \
-    pseudonymize_spelled_names_labels
-from _SourceCode.Anonymization.pseudonymization_methods.Time_Pseudonymization import pseudonymize_time_labels
-from _SourceCode.Anonymization.pseudonymization_methods.URL_Pseudonymization import pseudonymize_url_labels
+from _SourceCode.AnnotationHelpers.SpanRewriter import write_rewritten_spans
+from _SourceCode.Anonymization import PseudonymizerRegistry
 from _SourceCode.FileDataExtraction import TextExtraction
-from _SourceCode.ToolsUtils import PresidioRecognizers
+from _SourceCode.ModelClasses.PseudonymizationContext import PseudonymizationContext
 
-name_mapping = {}
-org_mapping = {}
-id_mapping = {}
+_worker_options = {}
 
 
-def anonymize(output_directory, json_data):
-    global name_mapping, org_mapping
+def anonymize(output_directory, get_file_annotations, workers=1):
     """
     Go through the hearing files in hearings_txt and pseudonymize
     the annotations data based on label.
@@ -41,6 +23,11 @@ def anonymize(output_directory, json_data):
     with X being a number.
     Same person occurring again will have the same number assigned to them. 
     Same applies for all labels.
+    get_file_annotations(hearing_text_file) returns the annotations of a file ({'file': ..., 'annotations': [...]})
+    or None if the file has no annotations, so only the annotations of the file being pseudonymized are in memory.
+    Every file has its own PseudonymizationContext (maps and counters), so with workers > 1 the files are
+    pseudonymized by a pool of processes and the output is the same as with a single process.
+    get_file_annotations must then be picklable (a module-level function or a functools.partial of one).
     """
 
     pseudonymization_index_folder = output_directory + '_INDEX'
@@ -61,41 +48,34 @@ def anonymize(output_directory, json_data):
 
     print('---------PSEUDONYMIZATION started---------')
 
-    for index, hearing_text_file in enumerate(os.listdir(Constants.hearings_txt_directory)):
-        # reset the global maps
-        name_mapping = {}
-        org_mapping = {}
-
-        if hearing_text_file.lower().endswith(Constants.text_format):
-
-            # find the file and annotation data in the json file
-            annotations = []
-            annotations_json = [data for data in json_data if hearing_text_file == data['file']]
-            if annotations_json:
-                annotations = annotations_json[0]
-
-            text = TextExtraction.extract_text_from_txt_file(hearing_text_file)
-            if annotations:  # get annotation data for this file from the json
-
-                print('\n')
-                print(f'{index + 1} ----- Pseudonymizing {hearing_text_file}')
-                annotations = _generate_annotation_replacements(index, annotations['annotations'],
-                                                                hearing_text_file,
-                                                                pseudonymization_index_folder)
-
-                if text and annotations:
-                    pseudonymized_file_name = _get_pseudonymized_file_name(
-                        hearing_text_file.replace('.txt', '')) + f'_{index + 1}.txt'
-                    files_pseudonymized_index_map[hearing_text_file] = pseudonymized_file_name
-
-                    pseudonymized_text = _replace_in_text(annotations, text)
-
-                    pseudonymized_text_output = os.path.join(output_directory, pseudonymized_file_name)
+    options = {
+        'output_directory': output_directory,
+        'pseudonymization_index_folder': pseudonymization_index_folder,
+        'get_file_annotations': get_file_annotations,
+    }
+    indexed_files = [(index, hearing_text_file)
+                     for index, hearing_text_file in enumerate(os.listdir(Constants.hearings_txt_directory))
+                     if hearing_text_file.lower().endswith(Constants.text_format)]
+
+    if workers > 1:
+        print(f"Pseudonymizing {len(indexed_files)} files with {workers} processes.")
+        # where the workers are forked, they share the classifications and the models already loaded (see
+        # ParallelAnnotation.py), frozen so that their garbage collector doesn't copy them
+        gc.collect()
+        gc.freeze()
+        try:
+            with multiprocessing.Pool(processes=workers, initializer=_init_worker, initargs=(options,)) as pool:
+                # the results come back in the order of the files, so the index file is the same as with 1 process
+                results = list(pool.imap(_pseudonymize_file_in_worker, indexed_files))
+        finally:
+            gc.unfreeze()
+    else:
+        results = [(hearing_text_file, _pseudonymize_file(index, hearing_text_file, **options))
+                   for index, hearing_text_file in indexed_files]
 
-                    WriteToFiles.write_text_into_file(pseudonymized_text_output, pseudonymized_text)
-                    print(index + 1, "----- [PSEUDONYMIZATION] ---", hearing_text_file, "➡", pseudonymized_file_name)
-                else:
-                    print(index + 1, "----- [PSEUDONYMIZATION] ---", hearing_text_file, " - Nothing to pseudonymize.")
+    for hearing_text_file, pseudonymized_file_name in results:
+        if pseudonymized_file_name:
+            files_pseudonymized_index_map[hearing_text_file] = pseudonymized_file_name
 
     print('\n---------PSEUDONYMIZATION ended---------')
 
@@ -108,29 +88,66 @@ def anonymize(output_directory, json_data):
     WriteToFiles.write_text_into_file(all_files_index_file, '\n'.join(file_index_list))
 
 
-def _generate_annotation_replacements(loop_index, annotations, hearing_text_file, pseudonymization_index_folder):
+def _init_worker(options):
+    """
+    Runs once in every worker process: keep the options
+    """
+    _worker_options.update(options)
+
+
+def _pseudonymize_file_in_worker(indexed_file):
+    """
+    Runs in a worker process, pseudonymize a single file
+    """
+    index, hearing_text_file = indexed_file
+    return hearing_text_file, _pseudonymize_file(index, hearing_text_file, **_worker_options)
+
+
+def _pseudonymize_file(index, hearing_text_file, output_directory, pseudonymization_index_folder,
+                       get_file_annotations):
+    """
+    Pseudonymize a single hearing file and write its pseudonymized file and its index file.
+    Returns the name of the pseudonymized file or None if nothing was pseudonymized.
+    """
+    # find the annotation data of the file directly in the annotation store
+    annotations = get_file_annotations(hearing_text_file)
+    if not annotations:
+        return None
+
+    text = TextExtraction.extract_text_from_txt_file(hearing_text_file)
+
+    # the maps and counters of the file
+    context = PseudonymizationContext()
+
+    print('\n')
+    print(f'{index + 1} ----- Pseudonymizing {hearing_text_file}')
+    annotations = _generate_annotation_replacements(index, annotations['annotations'],
+                                                    hearing_text_file,
+                                                    pseudonymization_index_folder,
+                                                    context)
+
+    if text and annotations:
+        pseudonymized_file_name = _get_pseudonymized_file_name(
+            hearing_text_file.replace('.txt', ''), context.name_mapping) + f'_{index + 1}.txt'
+
+        pseudonymized_text_output = os.path.join(output_directory, pseudonymized_file_name)
+
+        _write_replaced_text(pseudonymized_text_output, annotations, text)
+        print(index + 1, "----- [PSEUDONYMIZATION] ---", hearing_text_file, "➡", pseudonymized_file_name)
+        return pseudonymized_file_name
+
+    print(index + 1, "----- [PSEUDONYMIZATION] ---", hearing_text_file, " - Nothing to pseudonymize.")
+    return None
+
+
+def _generate_annotation_replacements(loop_index, annotations, hearing_text_file, pseudonymization_index_folder,
+                                      context):
     """
     Fill replacements for the annotations with pseudonymized data
     """
 
-    # set the replacement in the main annotations list
-    insert_into_annotations(
-        annotations=annotations,
-        names=pseudonymize_person_labels(annotations, name_mapping),
-        spelled_names=pseudonymize_spelled_names_labels(annotations, name_mapping),
-        organizations=pseudonymize_organization_labels(annotations, org_mapping),
-        locations=pseudonymize_location_labels(annotations),
-        urls=pseudonymize_url_labels(annotations),
-        emails=pseudonymize_email_labels(annotations),
-        nrps=pseudonymize_nrp_labels(annotations),
-        dates=pseudonymize_date_labels(annotations),
-        times=pseudonymize_time_labels(annotations),
-        ids=pseudonymize_id_labels(annotations, id_mapping),
-        ages=pseudonymize_age_labels(annotations),
-        heights=pseudonymize_height_labels(annotations),
-        phone_numbers=pseudonymize_phone_number_labels(annotations),
-        spelled_out_items=pseudonymize_spelled_out_items_labels(annotations)
-    )
+    # set the replacement in the main annotations list, with the registered method of each label
+    PseudonymizerRegistry.pseudonymize_annotations(annotations, context)
 
     # Save in a folder called PSEUDONYMIZED_INDEX which contains
     # the original values and their pseudonymized values
@@ -139,9 +156,10 @@ def _generate_annotation_replacements(loop_index, annotations, hearing_text_file
     if not os.path.exists(pseudonymization_index_folder):
         os.makedirs(pseudonymization_index_folder)
 
-    anonymizations = set([f'{ann.label} | {ann.preview}  ➡  {ann.replacement}'
-                          for ann in annotations
-                          ])
+    # unique lines in the order of the annotations
+    anonymizations = list(dict.fromkeys([f'{ann.label} | {ann.preview}  ➡  {ann.replacement}'
+                                         for ann in annotations
+                                         ]))
 
     if anonymizations:
         WriteToFiles.write_text_into_file(file, '\n'.join(anonymizations))
@@ -149,23 +167,20 @@ def _generate_annotation_replacements(loop_index, annotations, hearing_text_file
     return annotations
 
 
-def _replace_in_text(annotations, text):
+def _write_replaced_text(file, annotations, text):
     """
-    Replace the annotations with the 'replacement'
+    Replace the annotations with the 'replacement' and write the text directly into the file
     """
-    annotations.sort(key=lambda x: int(x.start), reverse=True)
-    for ann in annotations:
-        start = int(ann.start)
-        end = int(ann.end)
-        replacement = ann.replacement if ann.replacement else ann.preview
-        text = text[:start] + replacement + text[end:]
+    write_rewritten_spans(file, text, _get_replacement_edits(annotations), file)
+
 
-    return text
+def _get_replacement_edits(annotations):
+    return [(ann.start, ann.end, ann.replacement if ann.replacement else ann.preview) for ann in annotations]
 
 
-def _get_pseudonymized_file_name(file_name):
+def _get_pseudonymized_file_name(file_name, name_mapping):
     """
-    Pseudonymize the file name by using the maps that we have so that the data in the file name
+    Pseudonymize the file name by using the name map of the file so that the data in the file name
     is consistent with the content inside
     """
 
@@ -180,7 +195,7 @@ def _get_pseudonymized_file_name(file_name):
         is_id_conditions = [
             part.isalnum(),
             not part.isalpha(),
-            _matches_patterns(part, PresidioRecognizers.IDRecognizer.patterns),
+            _matches_patterns(part, Constants.id_patterns),
             not id_changed
         ]
 
@@ -0,0 +1,92 @@
+from _SourceCode import Constants
+from _SourceCode.AnnotationHelpers.AnnotationReplace import insert_into_annotations, get_replacement_by_annotation_id, \
+    get_replacement_keeping_all_caps, get_person_replacement
+from _SourceCode.Anonymization.pseudonymization_methods.Age_Pseudonymization import pseudonymize_age_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Date_Pseudonymization import pseudonymize_date_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Email_Pseudonymization import pseudonymize_email_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Height_Pseudonymization import pseudonymize_height_labels
+from _SourceCode.Anonymization.pseudonymization_methods.ID_Pseudonymization import pseudonymize_id_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Location_Pseudonymization import pseudonymize_location_labels
+from _SourceCode.Anonymization.pseudonymization_methods.NRP_Pseudonymization import pseudonymize_nrp_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Organization_Pseudonymization import \
+    pseudonymize_organization_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Person_Pseudonymization import pseudonymize_person_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Phone_Number_Pseudonymization import \
+    pseudonymize_phone_number_labels
+from _SourceCode.Anonymization.pseudonymization_methods.SpelledOutItems_Pseudonymization import \
+    pseudonymize_spelled_out_items_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Spelled_Name_Pseudonymization import \
+    pseudonymize_spelled_names_labels
+from _SourceCode.Anonymization.pseudonymization_methods.Time_Pseudonymization import pseudonymize_time_labels
+from _SourceCode.Anonymization.pseudonymization_methods.URL_Pseudonymization import pseudonymize_url_labels
+
+"""
+Registry of the pseudonymization methods, one per label.
+The annotations of a file are grouped by label in a single pass and only the methods of the labels found in the file
+are called, each with the annotations of its label only and the PseudonymizationContext of the file. The methods are
+called in the order they were registered: a method that uses a map filled by another one (SPELLED_NAME uses the
+name_mapping of PERSON) must be registered after it.
+To pseudonymize a new label, register its method with register_pseudonymizer.
+"""
+
+_pseudonymizers = {}  # label -> (pseudonymize, get_replacement), in the order of registration
+
+
+def register_pseudonymizer(label, pseudonymize, get_replacement=get_replacement_by_annotation_id):
+    """
+    Register the pseudonymization method of a label, registering a label again replaces its method.
+
+    Parameters:
+        label (str): The label of the annotations (Constants.LABEL_...)
+        pseudonymize (function): Takes the annotations of the label and the PseudonymizationContext of the file
+            and returns their NameEntity items with the replacement filled, by annotation_id
+        get_replacement (function): Takes an annotation and the NameEntity items returned by pseudonymize and returns
+            the replacement of the annotation (None if it has none)
+    """
+    _pseudonymizers[label] = (pseudonymize, get_replacement)
+
+
+def group_annotations_by_label(annotations):
+    """
+    Group the annotations by label in a single pass, keeping their order
+    """
+    annotations_by_label = {}
+    for annotation in annotations:
+        annotations_by_label.setdefault(annotation.label, []).append(annotation)
+    return annotations_by_label
+
+
+def pseudonymize_annotations(annotations, context):
+    """
+    Call the registered method of each label found in the annotations and fill the replacement of the annotations.
+    context is the PseudonymizationContext of the file, shared by the methods of all the labels.
+    """
+    annotations_by_label = group_annotations_by_label(annotations)
+
+    entities_by_label = {}
+    replacement_getters = {}
+    for label, (pseudonymize, get_replacement) in _pseudonymizers.items():
+        label_annotations = annotations_by_label.get(label)
+        if not label_annotations:
+            continue
+
+        entities_by_label[label] = pseudonymize(label_annotations, context)
+        replacement_getters[label] = get_replacement
+
+    return insert_into_annotations(annotations, entities_by_label, replacement_getters)
+
+
+register_pseudonymizer(Constants.LABEL_PERSON, pseudonymize_person_labels, get_person_replacement)
+register_pseudonymizer(Constants.LABEL_SPELLED_NAME, pseudonymize_spelled_names_labels)
+register_pseudonymizer(Constants.LABEL_ORGANIZATION, pseudonymize_organization_labels, get_replacement_keeping_all_caps)
+register_pseudonymizer(Constants.LABEL_LOCATION, pseudonymize_location_labels, get_replacement_keeping_all_caps)
+register_pseudonymizer(Constants.LABEL_URL, pseudonymize_url_labels)
+register_pseudonymizer(Constants.LABEL_EMAIL_ADDRESS, pseudonymize_email_labels)
+register_pseudonymizer(Constants.LABEL_NRP, pseudonymize_nrp_labels, get_replacement_keeping_all_caps)
+register_pseudonymizer(Constants.LABEL_DATE, pseudonymize_date_labels)
+register_pseudonymizer(Constants.LABEL_TIME, pseudonymize_time_labels)
+register_pseudonymizer(Constants.LABEL_ID, pseudonymize_id_labels)
+register_pseudonymizer(Constants.LABEL_AGE, pseudonymize_age_labels)
+register_pseudonymizer(Constants.LABEL_HEIGHT, pseudonymize_height_labels)
+register_pseudonymizer(Constants.LABEL_PHONE_NUMBER, pseudonymize_phone_number_labels)
+register_pseudonymizer(Constants.LABEL_SPELLED_OUT_ITEM, pseudonymize_spelled_out_items_labels)
@@ -1,7 +1,7 @@
 import re
 
-from _SourceCode import HelperFunctions, Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode import HelperFunctions
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 """
 This is a class that holds the functions for the pseudonymization anonymization technique, namely for the AGE label.
@@ -10,20 +10,20 @@ split_string_pattern = r'(\w+|[^\w\s]|\s)'
 approximate_age_pattern = r'\b\d{1,2}ish\b'
 
 
-def pseudonymize_age_labels(annotations):
+def pseudonymize_age_labels(annotations, context):
     """
     Filters the annotations to only hold the AGE label.
     The numerical values in the annotations are replaced with "[AGE]
     The pseudonymized values are then filled inside NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for AGE values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for AGE values with the 'replacement' variable filled.
     """
 
-    name_entity_ages = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if
-                        item.label == Constants.LABEL_AGE]
+    name_entity_ages = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
 
     # Next generate replacements for the age values
     for age in name_entity_ages:
@@ -42,7 +42,7 @@ def pseudonymize_age_labels(annotations):
         pseudo_age = _get_pseudonymized_age(age_value_worded_numbers=age_value_worded_numbers)
         age.name_replacement = pseudo_age
 
-    return name_entity_ages
+    return name_entities_by_annotation_id(name_entity_ages)
 
 
 def _get_pseudonymized_age(age_value_worded_numbers):
@@ -2,9 +2,9 @@ import calendar
 import re
 from datetime import datetime
 
-from _SourceCode import HelperFunctions, Constants
+from _SourceCode import HelperFunctions
 from _SourceCode.Constants import split_string_pattern
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 simple_date_pattern = (r'\d{1,2}\/\d{1,2}\/(?:\d{4}|\d{2})\b|'
                        r'\d{1,2}-\d{1,2}-(?:\d{4}|\d{2})\b|'
@@ -19,7 +19,7 @@ days_of_week_pattern = r'\b(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Su
 ordinal_day_pattern = r'\b\d{1,2}(th|st|nd|rd)\b'
 decade_pattern = r'\b\d0s\b'
 
-def pseudonymize_date_labels(annotations):
+def pseudonymize_date_labels(annotations, context):
     """
     Filters the annotations to only hold the DATE label.
     The process is to split each date value and go through the items one by one and replace with the
@@ -27,13 +27,13 @@ def pseudonymize_date_labels(annotations):
     Every numerical value in the entity's value is replaced with a placeholder depending on the case of the value.
     Placeholders can be [DATE], [DAY_OF_WEEK], [YEAR]...
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for DATE values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for DATE values with the 'replacement' variable filled.
     """
 
-    date_entities = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if
-                     item.label == Constants.LABEL_DATE]
+    date_entities = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
 
     for date in date_entities:
 
@@ -111,7 +111,7 @@ def pseudonymize_date_labels(annotations):
         if rebuilt_string != date.name:
             date.name_replacement = ''.join(copy_split_string)
 
-    return date_entities
+    return name_entities_by_annotation_id(date_entities)
 
 
 def _handle_nineteen_thousand_date_case(date_name, split_string):
@@ -1,8 +1,7 @@
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
-def pseudonymize_email_labels(annotations):
+def pseudonymize_email_labels(annotations, context):
     """
     Filters the annotations to only hold the EMAIL_ADDRESS label.
     Emails are then saved in a map so that if the same Email value is occurred more than once,
@@ -10,14 +9,14 @@ def pseudonymize_email_labels(annotations):
     The pseudonymized values are then filled inside NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
 
     Returns:
-        List of NameEntity for Email values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for Email values with the 'replacement' variable filled.
     """
 
-    emails = list(
-        set([item for item in annotations if item.label == Constants.LABEL_EMAIL_ADDRESS]))
+    emails = list(dict.fromkeys(annotations))
     emails = [NameEntity(name=item.preview, all_caps=item.preview.isupper(), annotation_id=item.annotation_id)
               for item in emails]
 
@@ -33,4 +32,4 @@ def pseudonymize_email_labels(annotations):
 
         email.name_replacement = '[' + pseudo_email + ']'
 
-    return emails
+    return name_entities_by_annotation_id(emails)
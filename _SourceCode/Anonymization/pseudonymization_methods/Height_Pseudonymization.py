@@ -1,22 +1,23 @@
 import re
 
 from _SourceCode import HelperFunctions, Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
-def pseudonymize_height_labels(annotations):
+def pseudonymize_height_labels(annotations, context):
     """
     Filters the annotations to only hold the HEIGHT label.
     Numerical values in HEIGHTs are replaced with the placeholder [HEIGHT]
     The full string is rebuild and filled inside the NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for HEIGHT values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for HEIGHT values with the 'replacement' variable filled.
     """
 
-    heights = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if item.label == Constants.LABEL_HEIGHT]
+    heights = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
 
     for height in heights:
 
@@ -28,4 +29,4 @@ def pseudonymize_height_labels(annotations):
                 split_height[index] = "[HEIGHT]"
 
         height.name_replacement = ''.join(split_height)
-    return heights
+    return name_entities_by_annotation_id(heights)
@@ -1,12 +1,9 @@
 import re
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
-id_count = 1  # the main count to add next to the ID_ part
 
-
-def pseudonymize_id_labels(annotations, id_map):
+def pseudonymize_id_labels(annotations, context):
     """
     Filters the annotations to only hold the ID label.
     IDs are then pseudonymized and saved in a map so that if the same ID value is occurred again,
@@ -14,16 +11,15 @@ def pseudonymize_id_labels(annotations, id_map):
     The pseudonymized values are then filled inside NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
-        id_map (dict): Map original IDs to their pseudonymized versions
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file, its id_mapping (original IDs to
+            their pseudonymized versions) is filled
 
     Returns:
-        List of NameEntity for ID values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for ID values with the 'replacement' variable filled.
     """
-    global id_count
-    id_count = 1
-    ids = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if
-           item.label == Constants.LABEL_ID]
+    id_map = context.id_mapping
+    ids = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
 
     # IDs usually look like a letter or 2 followed by numbers
     digit_pattern = r'\d+'
@@ -37,21 +33,17 @@ def pseudonymize_id_labels(annotations, id_map):
 
         if numbers:
             if numbers not in id_map:
-                id_map[numbers] = _get_pseudo_value()
+                id_map[numbers] = _get_pseudo_value(context)
             pseudo_id += id_map[numbers]
 
         id_entity.name_replacement = '[' + pseudo_id + ']'
 
-    return ids
+    return name_entities_by_annotation_id(ids)
 
 
-def _get_pseudo_value():
+def _get_pseudo_value(context):
     """
     Return a value under the form of ID_X with X being a counter.
     Increment the counter
     """
-    global id_count
-
-    pseudonymized_id = 'ID_' + str(id_count)
-    id_count += 1
-    return pseudonymized_id
+    return 'ID_' + str(context.next_count('id_count'))
@@ -2,8 +2,8 @@ import re
 
 
 from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
-from _SourceCode.ToolsUtils import Classifier
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
+from _SourceCode.ToolsUtils import Classifier, Gazetteer
 
 location_labels = ["Zip Code", "zip", "zipcode", "Address", "Country", "State", "City", "Miscellaneous"]
 location_suffixes = {
@@ -14,71 +14,68 @@ location_suffixes = {
     "Country": ("Country", 'country_count'),
     "State": ("State", 'state_count'),
     "City": ("City", 'city_count'),
+    "County": ("County", 'county_count'),  # only given by the gazetteer
     "Miscellaneous": ("Miscellaneous", 'location_count'),
 }
-county_count = 1
-zip_code_count = 1
-address_count = 1
-country_count = 1
-state_count = 1
-city_count = 1
-location_count = 1
 
 
-def pseudonymize_location_labels(annotations):
+def pseudonymize_location_labels(annotations, context):
     """
     Filters the annotations to only hold the location label.
     Locations are then pseudonymized and saved in a map so that if the same location value is occurred more than once,
     it will have the same pseudonymized value.
     The pseudonymized values are then filled inside NameEntity's replacement variable.
-    The process is to use a zero shot model to figure out what kind of location we have and then
-     pseudonymize a new value based on what the zero shot model says
+    The process is to look the location up in the gazetteer (or use a zero shot model if it's not in it) to figure out
+     what kind of location we have and then pseudonymize a new value based on that
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
 
     Returns:
-        List of NameEntity for Location values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for Location values with the 'replacement' variable filled.
     """
-    global zip_code_count, address_count, country_count, state_count, city_count, location_count
-    global county_count
-    county_count = 1
-    zip_code_count = 1
-    address_count = 1
-    country_count = 1
-    state_count = 1
-    city_count = 1
-    location_count = 1
-
-    locations = list(
-        set([item for item in annotations if item.label == Constants.LABEL_LOCATION and item.preview]))
+    locations = list(dict.fromkeys([item for item in annotations if item.preview]))
     locations = [NameEntity(name=item.preview, all_caps=item.preview.isupper(), annotation_id=item.annotation_id) for
                  item in locations]
 
     locations.sort(key=lambda x: len(x.name))
     location_map = {}
 
+    # classify all the locations of the file at once
+    Classifier.prefetch_classifications(get_locations_to_classify([location.name for location in locations]),
+                                        location_labels)
+
     for location in locations:
         # if the location has 'county' in it, take a pseudonymized county from the list of counties
         if 'county' in location.name.lower():
             if location.name.title() in location_map:
                 pseudo_location = location_map[location.name.title()]
             else:
-                pseudo_location = ("COUNTY_" if location.name.isupper() else "County_") + str(county_count)
-                county_count += 1
+                pseudo_location = ("COUNTY_" if location.name.isupper() else "County_") + str(
+                    context.next_count('county_count'))
                 location_map[location.name.title()] = pseudo_location
             location.name_replacement = '[' + (pseudo_location.upper() if location.name.isupper() else pseudo_location) + ']'
             continue
 
-        pseudo_location = _get_pseudonymized_location(location.name, location_map)
+        pseudo_location = _get_pseudonymized_location(location.name, location_map, context)
         if location.all_caps:
             pseudo_location = pseudo_location.upper()
 
         location.name_replacement = '[' + pseudo_location.replace("\n", ". ") + ']'
-    return locations
+    return name_entities_by_annotation_id(locations)
+
+
+def get_locations_to_classify(location_values):
+    """
+    The values that can be sent to the zero shot model among the given location values: all of them except the
+    counties, the empty ones and the ones in the gazetteer (see _pseudonymize_value)
+    """
+    return [location for location in location_values if location.strip() and 'county' not in location.lower()
+            and Gazetteer.get_location_type(location) is None]
 
 
-def _get_pseudonymized_location(location, location_map):
+def _get_pseudonymized_location(location, location_map, context):
     """
     Get a pseudonymized location. If it's already present in the location_map, then return it.
     Otherwise generate a new one and add it to the map.
@@ -86,6 +83,7 @@ def _get_pseudonymized_location(location, location_map):
     Parameters:
         location (str): The original location
         location_map (dict): The map of Location and it's already generated pseudonymized values
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
 
     Returns:
         str: a pseudonymized location value
@@ -105,40 +103,34 @@ def _get_pseudonymized_location(location, location_map):
                 return location_map[part.title()]
 
         # else pseudonymize the current value and add it to the map
-        pseudo_location = _pseudonymize_value(location).title()
+        pseudo_location = _pseudonymize_value(location, context).title()
         location_map[location.title()] = pseudo_location.title()
         return pseudo_location
 
 
-def _pseudonymize_value(location):
+def _pseudonymize_value(location, context):
     """
-    Get the type of location from the zero shot model and generate a pseudonymized location value based on
-    the location type
+    Get the type of location from the gazetteer, or from the zero shot model if the location isn't in it, and generate
+    a pseudonymized location value based on the location type
 
     Parameters:
         location (str): The original location
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
 
     Returns:
         str: a pseudonymized location value
     """
 
-    global location_count
-    global zip_code_count, address_count, country_count, state_count, city_count, location_count
-
-    location_type = Classifier.classify_entity(location, location_labels)
+    location_type = Gazetteer.get_location_type(location)
     if location_type is None:
-        pseudo_location = "Location_" + str(location_count)
-        location_count += 1
-        return pseudo_location
+        location_type = Classifier.classify_entity(location, location_labels)
+    if location_type is None:
+        return "Location_" + str(context.next_count('location_count'))
 
     # Check location labels to see if the current location value contains one of the location suffixes
     for key, (suffix, counter_name) in location_suffixes.items():
         if key.lower() in location_type.lower():
-            pseudo_location = suffix.replace(' ', '_').upper() + '_' + str(globals()[counter_name])
-            globals()[counter_name] += 1
-            return pseudo_location
+            return suffix.replace(' ', '_').upper() + '_' + str(context.next_count(counter_name))
 
     # Else just return Location_X
-    pseudo_location = "Location_" + str(location_count)
-    location_count += 1
-    return pseudo_location
+    return "Location_" + str(context.next_count('location_count'))
@@ -1,22 +1,24 @@
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
-import inflect
-
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 from _SourceCode.ToolsUtils import Classifier
 
 nrp_types = ["Person's religion", "Religion name", "Politics", "Political Stance", "Nationality", "Language",
              "Ethnicity"]
-inflect_engine = inflect.engine()
-religion_count = 1
-politics_count = 1
-nationality_count = 1
-language_count = 1
-ethnicity_count = 1
-nrp_count = 1
+_inflect_engine = None
+
+
+def get_inflect_engine():
+    """
+    Create the inflect engine the first time a NRP is pseudonymized (importing inflect takes more than a second)
+    """
+    global _inflect_engine
+    if _inflect_engine is None:
+        import inflect
+        _inflect_engine = inflect.engine()
+    return _inflect_engine
 
 
-def pseudonymize_nrp_labels(annotations):
+def pseudonymize_nrp_labels(annotations, context):
     """
     Filters the annotations to only hold the NRP label.
     NRPs are then pseudonymized and saved in a map so that if the same NRP value is occurred more than once,
@@ -26,52 +28,66 @@ def pseudonymize_nrp_labels(annotations):
     label replacement with the sequential number appended at the end
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
     Returns:
-        List of NameEntity for NRP values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for NRP values with the 'replacement' variable filled.
     """
-    global religion_count, politics_count, nationality_count, language_count, ethnicity_count, nrp_count
-
-    religion_count = 1
-    politics_count = 1
-    nationality_count = 1
-    language_count = 1
-    ethnicity_count = 1
-    nrp_count = 1
-
-    nrps = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if
-            item.label == Constants.LABEL_NRP]
+    nrps = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
     nrp_map = {}
 
+    # classify all the NRPs of the file at once
+    Classifier.prefetch_classifications(get_nrps_to_classify([nrp.name for nrp in nrps]), nrp_types)
+
     for nrp in nrps:
+        singular_word = _get_singular_nrp(nrp.name)
 
-        has_a = nrp.name.lower().startswith('a ')
-        has_the = nrp.name.lower().startswith('the ')
-        has_aa = nrp.name.lower().startswith('aa ')
-        has_ex = nrp.name.lower().startswith('ex-')
+        pseudo_nrp = _get_pseudo_NRP_w_map(nrp_map=nrp_map, singular_word=singular_word, context=context)
+        nrp.name_replacement = '[' + (pseudo_nrp.upper() if nrp.name.isupper() else pseudo_nrp) + ']'
 
-        current_nrp = nrp.name.title()
-        if 'islamic' == nrp.name.lower():  # in this specific case, remove the 'ic' for the nrp_map
-            current_nrp = current_nrp[:-2]
+    return name_entities_by_annotation_id(nrps)
 
-        if has_a or has_the or has_aa:
-            split_nrp = current_nrp.lower().split()
-            if len(split_nrp) > 1:
-                current_nrp = ' '.join(split_nrp[1:len(split_nrp)])
-        elif has_ex:
-            current_nrp = current_nrp.lower().replace('ex-', '')
 
-        singular_word = inflect_engine.singular_noun(current_nrp.title())
-        if not singular_word:  # if word is not plural, singular_noun() returns False
-            singular_word = current_nrp.title()
+def get_nrps_to_classify(nrp_values):
+    """
+    The values sent to the zero shot model for the given NRP values (see _get_pseudo_NRP_w_map), the empty values
+    are skipped (inflect doesn't take empty words)
+    """
+    return [_get_singular_nrp(nrp_value) for nrp_value in nrp_values if nrp_value.strip()]
 
-        pseudo_nrp = _get_pseudo_NRP_w_map(nrp_map=nrp_map, singular_word=singular_word)
-        nrp.name_replacement = '[' + (pseudo_nrp.upper() if nrp.name.isupper() else pseudo_nrp) + ']'
 
-    return nrps
+def _get_singular_nrp(nrp_value):
+    """
+    The NRP without its article or 'ex-' in its singular form, used as key of the nrp_map
+
+    Parameters:
+        nrp_value (str): The original NRP
+    Returns:
+        str: the single form of the word obtained thanks to the inflect library
+    """
+    has_a = nrp_value.lower().startswith('a ')
+    has_the = nrp_value.lower().startswith('the ')
+    has_aa = nrp_value.lower().startswith('aa ')
+    has_ex = nrp_value.lower().startswith('ex-')
+
+    current_nrp = nrp_value.title()
+    if 'islamic' == nrp_value.lower():  # in this specific case, remove the 'ic' for the nrp_map
+        current_nrp = current_nrp[:-2]
+
+    if has_a or has_the or has_aa:
+        split_nrp = current_nrp.lower().split()
+        if len(split_nrp) > 1:
+            current_nrp = ' '.join(split_nrp[1:len(split_nrp)])
+    elif has_ex:
+        current_nrp = current_nrp.lower().replace('ex-', '')
 
+    singular_word = get_inflect_engine().singular_noun(current_nrp.title())
+    if not singular_word:  # if word is not plural, singular_noun() returns False
+        singular_word = current_nrp.title()
+    return singular_word
 
-def _get_pseudo_NRP_w_map(nrp_map, singular_word):
+
+def _get_pseudo_NRP_w_map(nrp_map, singular_word, context):
     """
     Takes the nrp_map and the singular word form of the original NRP obtained from the inflect library
     Generates a pseudonymized NRP, compares it to existing values to make sure it's unique, add to map and return it
@@ -79,6 +95,7 @@ def _get_pseudo_NRP_w_map(nrp_map, singular_word):
     Parameters:
         nrp_map (dict): the NRP map and its values
         singular_word (str): the single form of the word obtained thanks to the inflect library
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
     Returns:
         Returns a random element in the religion_names, religions, political_affiliations or nationalities list
     """
@@ -90,52 +107,42 @@ def _get_pseudo_NRP_w_map(nrp_map, singular_word):
         # Use a zero shot model to figure out if this NRP is
         # a nationality, religion or political affiliation
         nrp_type = Classifier.classify_entity(singular_word, nrp_types)
-        pseudo_nrp = _get_pseudo_value(nrp_type)
+        pseudo_nrp = _get_pseudo_value(nrp_type, context)
 
     nrp_map[singular_word] = pseudo_nrp  # add to map
     return pseudo_nrp
 
 
-def _get_pseudo_value(nrp_type):
+def _get_pseudo_value(nrp_type, context):
     """
     Take the nrp type from the zero shot model and append the count at the end
     If it's a specific value like "Religion", return "RELIGION_X" with X being a counter
 
     Parameters:
         nrp_type (str): the nrp type from the zero shot model
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
     Returns:
         (str) Returns a pseudonymized value under the form of RELIGION_X, NATIONALITY_X...
     """
 
-    global religion_count, politics_count, nationality_count, ethnicity_count, language_count, nrp_count
-
     if nrp_type is None:
-        pseudonymized_value = "NRP_" + str(nrp_count)
-        nrp_count += 1
-        return pseudonymized_value
+        return "NRP_" + str(context.next_count('nrp_count'))
 
     pseudonymized_value = ""
     match nrp_type:
         case "Person's religion":
-            pseudonymized_value = "RELIGION_" + str(religion_count)
-            religion_count += 1
+            pseudonymized_value = "RELIGION_" + str(context.next_count('religion_count'))
         case "Religion name":
-            pseudonymized_value = "RELIGION_" + str(religion_count)
-            religion_count += 1
+            pseudonymized_value = "RELIGION_" + str(context.next_count('religion_count'))
         case "Politics":
-            pseudonymized_value = "POLITICAL_" + str(politics_count)
-            politics_count += 1
+            pseudonymized_value = "POLITICAL_" + str(context.next_count('politics_count'))
         case "Political Stance":
-            pseudonymized_value = "POLITICAL_" + str(politics_count)
-            politics_count += 1
+            pseudonymized_value = "POLITICAL_" + str(context.next_count('politics_count'))
         case "Nationality":
-            pseudonymized_value = "NATIONALITY_" + str(nationality_count)
-            nationality_count += 1
+            pseudonymized_value = "NATIONALITY_" + str(context.next_count('nationality_count'))
         case "Ethnicity":
-            pseudonymized_value = "ETHNICITY_" + str(ethnicity_count)
-            ethnicity_count += 1
+            pseudonymized_value = "ETHNICITY_" + str(context.next_count('ethnicity_count'))
         case "Language":
-            pseudonymized_value = "LANGUAGE_" + str(language_count)
-            language_count += 1
+            pseudonymized_value = "LANGUAGE_" + str(context.next_count('language_count'))
 
     return pseudonymized_value
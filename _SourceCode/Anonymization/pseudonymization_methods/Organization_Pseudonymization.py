@@ -1,28 +1,9 @@
 import re
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
-
-uni_count = 1
-school_count = 1
-prison_count = 1
-hospital_count = 1
-jail_count = 1
-asylum_count = 1
-police_count = 1
-facility_count = 1
-senate_count = 1
-training_count = 1
-group_count = 1
-bank_count = 1
-program_count = 1
-board_count = 1
-office_count = 1
-factory_count = 1
-organization_count = 1
-
-
-def pseudonymize_organization_labels(annotations, org_map):
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
+
+
+def pseudonymize_organization_labels(annotations, context):
     """
     Filters the annotations to only hold the ORGANIZATION label.
     Organizations are then pseudonymized and saved in a map so that if the same Organization value is occurred more than once,
@@ -32,50 +13,28 @@ def pseudonymize_organization_labels(annotations, org_map):
     based on the value returned from the model
 
     Parameters:
-        annotations (list): The list of Annotation items
-        org_map (dict): The organization map to be filled
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (organization map and counters)
     Returns:
-        List of NameEntity for Organization values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for Organization values with the 'replacement' variable filled.
     """
-    global uni_count, school_count, prison_count, hospital_count, jail_count, asylum_count, police_count, facility_count, senate_count, training_count, group_count, bank_count, program_count, board_count, office_count, factory_count
-    global organization_count
-
-    uni_count = 1
-    school_count = 1
-    prison_count = 1
-    hospital_count = 1
-    jail_count = 1
-    asylum_count = 1
-    police_count = 1
-    facility_count = 1
-    senate_count = 1
-    training_count = 1
-    group_count = 1
-    bank_count = 1
-    program_count = 1
-    board_count = 1
-    office_count = 1
-    factory_count = 1
-    organization_count = 1
-
-    organizations = list(
-        set([item for item in annotations if item.label == Constants.LABEL_ORGANIZATION]))
+    organizations = list(dict.fromkeys(annotations))
     organizations = [NameEntity(name=item.preview, all_caps=item.preview.isupper(), annotation_id=item.annotation_id)
                      for item in organizations]
     organizations.sort(key=lambda x: len(x.name))
 
     for organization in organizations:
-        pseudo_org = _get_pseudonymized_org(organization.name, org_map)
+        pseudo_org = _get_pseudonymized_org(organization.name, context.org_mapping, context)
 
         if organization.all_caps:
             pseudo_org = pseudo_org.upper()
 
         organization.name_replacement = '[' + pseudo_org + ']'
 
-    return organizations
+    return name_entities_by_annotation_id(organizations)
 
 
-def _get_pseudonymized_org(original_org, org_map):
+def _get_pseudonymized_org(original_org, org_map, context):
     """
     Get a pseudonymized Organization. If it's already present in the Organization_map, then return it.
     Otherwise, generate a new one and add it to the map.
@@ -83,6 +42,7 @@ def _get_pseudonymized_org(original_org, org_map):
     Parameters:
         original_org (str): The original Organization
         org_map (dict): The map of Organization and it's already generated pseudonymized values
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
 
     Returns:
         str: a pseudonymized Organization value
@@ -102,25 +62,23 @@ def _get_pseudonymized_org(original_org, org_map):
     if pseudo_name:
         return pseudo_name.upper() if original_org.isupper() else pseudo_name
 
-    pseudo_org = _pseudonymize_organization(original_org).title()
+    pseudo_org = _pseudonymize_organization(original_org, context).title()
     org_map[original_org.title()] = pseudo_org
 
     return pseudo_org.upper() if original_org.isupper() else pseudo_org
 
 
-def _pseudonymize_organization(original_org):
+def _pseudonymize_organization(original_org, context):
     """
     Generates a pseudonymized organization name based on if the original org contains some keywords,
     otherwise, generate pseudonymized company names
 
     Parameters:
         original_org (str): The original Organization
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
     Returns:
         str: a pseudonymized Organization value
     """
-    global uni_count, school_count, prison_count, hospital_count, jail_count, asylum_count, police_count, facility_count, senate_count, training_count, group_count, bank_count, program_count, board_count, office_count, factory_count
-    global organization_count
-
     keywords_suffixes = {
         "university": ("University", 'uni_count'),
         "school": ("School", 'school_count'),
@@ -146,14 +104,10 @@ def _pseudonymize_organization(original_org):
     for keyword, (suffix, counter_name) in keywords_suffixes.items():
         if re.search(keyword, original_org, flags=re.IGNORECASE):
             pseudonymized_value += (suffix.upper() if original_org.isupper() else suffix) + '_' + str(
-                globals()[counter_name])
-            globals()[counter_name] += 1
+                context.next_count(counter_name))
             break
 
     if pseudonymized_value:
         return pseudonymized_value
     else:
-        pseudonymized_org = "ORGANIZATION_" + str(organization_count)
-        organization_count += 1
-
-        return pseudonymized_org
+        return "ORGANIZATION_" + str(context.next_count('organization_count'))
@@ -2,27 +2,24 @@ import re
 
 from _SourceCode import HelperFunctions, Constants
 from _SourceCode.AnnotationHelpers.AnnotationReplace import clean_name
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_name
 
-person_count = 1  # the main count to add next to the PERSON_ part
 
-
-def pseudonymize_person_labels(annotations, name_mapping):
+def pseudonymize_person_labels(annotations, context):
     """
     Takes person labels from annotations, pseudonymize their names each part of the names, stores the pseudonymized values in a map
     and returns the person annotations as NameEntity list with their replacement value filled.
 
     Parameters:
-        annotations (list): List of annotations
-        name_mapping (dict): Map original names to their pseudonymized versions
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file, its name_mapping (original names
+            to their pseudonymized versions) is filled
 
     Returns:
-        list: List of updated NameEntity items with pseudonymized names
+        dict: cleaned name (title case) -> updated NameEntity with pseudonymized name
     """
-    global person_count
-    person_count = 1
-    person_annotations = [item for item in annotations if
-                          item.label == Constants.LABEL_PERSON and len(item.preview) > 1]
+    name_mapping = context.name_mapping
+    person_annotations = [item for item in annotations if len(item.preview) > 1]
 
     person_annotations.sort(key=lambda x: int(x.start))
 
@@ -38,6 +35,7 @@ def pseudonymize_person_labels(annotations, name_mapping):
         if not cut_off_name_found:
             new_parts = [_get_unique_name(original_name=part,
                                           name_mapping=name_mapping,
+                                          context=context,
                                           is_full_name=False) for part in parts]
 
         # set the replacement, keeping in mind the casing
@@ -50,15 +48,16 @@ def pseudonymize_person_labels(annotations, name_mapping):
         annotation_id=f"{name.start}|{name.end}"
     ) for name in person_annotations]
 
-    return combined_entities
+    return name_entities_by_name(combined_entities)
 
-def _get_unique_name(original_name, name_mapping, is_full_name=False):
+def _get_unique_name(original_name, name_mapping, context, is_full_name=False):
     """
     Replace the name given with a pseudonymized version, either from the map or create a new one
 
     Parameters:
         original_name (str): original name to be pseudonymized
         name_mapping (dict): map of original names and their pseudonymized versions
+        context (PseudonymizationContext): The pseudonymization state of the file (counters)
         is_full_name (bool): flag to know if the name_entities is from the full_names list or the other_names list
 
     Returns:
@@ -100,7 +99,7 @@ def _get_unique_name(original_name, name_mapping, is_full_name=False):
                 new_parts.append(name_mapping[part])
             else:
                 # Otherwise generate new
-                new_name = _get_pseudo_value()
+                new_name = _get_pseudo_value(context)
 
                 new_parts.append(new_name)
                 name_mapping[part] = new_name
@@ -115,7 +114,7 @@ def _get_unique_name(original_name, name_mapping, is_full_name=False):
             return name_mapping[original_name]
         else:
             # Generate a new unique name and make sure it's actually unique
-            new_name = _get_pseudo_value()
+            new_name = _get_pseudo_value(context)
             name_mapping[original_name] = new_name
             name_mapping[f'{original_name[0].upper()}'] = f'{new_name.upper()}'
             return new_name
@@ -150,14 +149,10 @@ def _handle_cut_off_name(name, new_parts, name_mapping):
     return False
 
 
-def _get_pseudo_value():
+def _get_pseudo_value(context):
     """
     Return a value under the form of PERSON_X with X being a counter.
     Increment the counter
     """
 
-    global person_count
-
-    pseudonymized_name = '[PERSON_' + str(person_count) + ']'
-    person_count += 1
-    return pseudonymized_name
+    return '[PERSON_' + str(context.next_count('person_count')) + ']'
@@ -1,10 +1,9 @@
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
 
-def pseudonymize_phone_number_labels(annotations):
+def pseudonymize_phone_number_labels(annotations, context):
     """
     Filters the annotations to only hold the PHONE_NUMBER label.
     Phone numbers are then pseudonymized and saved in a map so that if the same PHONE_NUMBER value is occurred again,
@@ -12,12 +11,12 @@ def pseudonymize_phone_number_labels(annotations):
     The pseudonymized values are then filled inside NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for PHONE_NUMBER values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for PHONE_NUMBER values with the 'replacement' variable filled.
     """
-    phone_numbers = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations if
-                     item.label == Constants.LABEL_PHONE_NUMBER]
+    phone_numbers = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in annotations]
     phone_numbers_map = {}
     phone_number_count = 1
 
@@ -31,4 +30,4 @@ def pseudonymize_phone_number_labels(annotations):
 
         phone_number.name_replacement = '[' + pseudo_phone + ']'
 
-    return phone_numbers
+    return name_entities_by_annotation_id(phone_numbers)
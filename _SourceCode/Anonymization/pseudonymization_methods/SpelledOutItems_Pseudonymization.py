@@ -1,8 +1,7 @@
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
-def pseudonymize_spelled_out_items_labels(annotations):
+def pseudonymize_spelled_out_items_labels(annotations, context):
     """
     Filters the annotations to only hold the SPELLED_OUT_ITEM label.
     The original values are saved in a map as key with the pseudonymized values as values.
@@ -10,15 +9,15 @@ def pseudonymize_spelled_out_items_labels(annotations):
     The pseudonymized values are then filled inside NameEntity's replacement variable.
 
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for SPELLED_OUT_ITEM values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for SPELLED_OUT_ITEM values with the 'replacement' variable filled.
     """
 
 
     spelled_out_items = [NameEntity(name=item.preview, annotation_id=item.annotation_id)
-                         for item in sorted(annotations, key=lambda x: x.start)
-                         if item.label == Constants.LABEL_SPELLED_OUT_ITEM]
+                         for item in sorted(annotations, key=lambda x: x.start)]
 
     spelled_items_map = {}
     spelled_items_count = 1
@@ -33,4 +32,4 @@ def pseudonymize_spelled_out_items_labels(annotations):
 
         spelled_out_item.name_replacement = '[' + pseudo_spelled_item + ']'
 
-    return spelled_out_items
+    return name_entities_by_annotation_id(spelled_out_items)
@@ -1,8 +1,8 @@
-from _SourceCode import HelperFunctions, Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode import HelperFunctions
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
-def pseudonymize_spelled_names_labels(annotations, name_mapping):
+def pseudonymize_spelled_names_labels(annotations, context):
     """
     Filters the annotations to only hold the SPELLED_NAMES label.
     Spelled names are then pseudonymized and saved in a map so that if the same Spelled name value _is occurred more than once,
@@ -13,14 +13,15 @@ def pseudonymize_spelled_names_labels(annotations, name_mapping):
     Example: SPELLED_NAME_PERSON_2 just means that this is the spelled name of Person_2
     the characters.
     Parameters:
-        annotations (list): The list of Annotation items
-        name_mapping (dict): The name dictionary with original name and their pseudonymized name
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file, its name_mapping (original names
+            and their pseudonymized names) must be filled by the PERSON labels first
     Returns:
-        List of NameEntity for Spelled names values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for Spelled names values with the 'replacement' variable filled.
     """
 
-    spelled_names = list(
-        set([item for item in annotations if item.label == Constants.LABEL_SPELLED_NAME]))
+    name_mapping = context.name_mapping
+    spelled_names = list(dict.fromkeys(annotations))
     spelled_names = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in spelled_names]
 
     for spelled_name in spelled_names:
@@ -41,7 +42,7 @@ def pseudonymize_spelled_names_labels(annotations, name_mapping):
 
         spelled_name.name_replacement = spelled_pseudo_name
 
-    return spelled_names
+    return name_entities_by_annotation_id(spelled_names)
 
 
 def _normalized_name(spelled_name):
@@ -1,8 +1,7 @@
 import calendar
 import re
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 time_regex = r'\d{1,2}[:;.]\d{2}'
 ordinal_day_pattern = r'\b\d{1,2}(th|st|nd|rd)\b'
@@ -11,7 +10,7 @@ month_names = list(calendar.month_name)[1:]
 months_pattern = r'\b(' + '|'.join(month_names) + r')'
 
 
-def pseudonymize_time_labels(annotations):
+def pseudonymize_time_labels(annotations, context):
     """
     Filters the annotations to only hold the TIME label.
     The process is to split each time value and go through the items one by one and pseudonymize them
@@ -19,13 +18,13 @@ def pseudonymize_time_labels(annotations):
     TIME annotations are then pseudonymized by having the numerical values in the TIME annotation replaced
      with the placeholder [TIME]
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for TIME values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for TIME values with the 'replacement' variable filled.
     """
 
-    times = list(
-        set([item for item in annotations if item.label == Constants.LABEL_TIME and item.preview]))
+    times = list(dict.fromkeys([item for item in annotations if item.preview]))
     times = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in times]
 
     for time_entity in times:
@@ -49,4 +48,4 @@ def pseudonymize_time_labels(annotations):
         # put the parts back together
         time_entity.name_replacement = ''.join(new_parts)
 
-    return times
+    return name_entities_by_annotation_id(times)
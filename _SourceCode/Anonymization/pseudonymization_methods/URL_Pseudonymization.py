@@ -1,24 +1,23 @@
 
-from _SourceCode import Constants
-from _SourceCode.ModelClasses.NameEntity import NameEntity
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id
 
 
 
-def pseudonymize_url_labels(annotations):
+def pseudonymize_url_labels(annotations, context):
     """
     Filters the annotations to only hold the URL label.
     Urls are then saved in a map so that if the same url value is occurred more than once,
     it will have the same pseudonymized value.
     The pseudonymized values are then filled inside NameEntity's replacement variable.
     Parameters:
-        annotations (list): The list of Annotation items
+        annotations (list): The Annotation items of this label (see PseudonymizerRegistry)
+        context (PseudonymizationContext): The pseudonymization state of the file (not used by this label)
     Returns:
-        List of NameEntity for url values with the 'replacement' variable filled.
+        dict: annotation_id -> NameEntity for url values with the 'replacement' variable filled.
     """
 
     url_count = 1
-    urls = list(
-        set([item for item in annotations if item.label == Constants.LABEL_URL and item.preview]))
+    urls = list(dict.fromkeys([item for item in annotations if item.preview]))
     urls = [NameEntity(name=item.preview, annotation_id=item.annotation_id) for item in urls]
     url_map = {}
 
@@ -32,4 +31,4 @@ def pseudonymize_url_labels(annotations):
 
         url.name_replacement = '[' + pseudo_url + ']'
 
-    return urls
+    return name_entities_by_annotation_id(urls)
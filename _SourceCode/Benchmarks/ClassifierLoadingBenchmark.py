@@ -0,0 +1,101 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from _SourceCode import Constants
+from _SourceCode.ToolsUtils import Classifier, MemoryUsage
+from _SourceCode.ToolsUtils.MemoryMappedWeights import get_safetensors_path
+
+"""
+Benchmark of the loading of the zero shot model from pytorch_model.bin (unpickled) and from model.safetensors
+(memory mapped, see MemoryMappedWeights.py).
+Each load runs in a new process, twice for each file: the first load ('cold') may have to read the file from the disk,
+the second one ('warm') finds it in the page cache (to measure a real cold load, clear the page cache of the system
+first). The memory mapped weights are only read from the disk when they are first used, so the time of the first
+classification is reported with the load time. For each load, the memory of the process (rss, uss and pss, see
+MemoryUsage.py) before the load, after the load and after classifying a few values is also reported (the process is
+the only one mapping the file, so the mapped weights count in its uss and pss: they are only shared when several
+processes map the file), and the outputs of the model (labels and scores of the sample values) are compared with the
+ones of the model loaded from pytorch_model.bin.
+The safetensors file must be written first (python -m _SourceCode.ToolsUtils.MemoryMappedWeights).
+
+Run from the root folder:
+    python -m _SourceCode.Benchmarks.ClassifierLoadingBenchmark
+"""
+
+loading_modes = {  # mode -> classifier_mmap_weights
+    'pickle': False,
+    'mmap': True,
+}
+sample_entities = ['California', 'Sacramento', 'Mexico', 'Los Angeles County', 'Main Street']
+sample_labels = ['Country', 'State', 'City', 'County', 'Street']
+
+
+def run_benchmark():
+    if not Classifier.is_classifier_available():
+        return
+
+    reference_outputs = None
+    for mode in loading_modes:
+        for run in ['cold', 'warm']:
+            output = subprocess.run([sys.executable, '-m', '_SourceCode.Benchmarks.ClassifierLoadingBenchmark', mode],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode} ({run}): loaded in {result['load_time']:.2f}s, "
+                  f"first classification in {result['classify_time']:.2f}s")
+            for step in ['before', 'loaded', 'classified']:
+                print(f"    {step}: {MemoryUsage.format_memory_usage(result[step])}")
+
+            if reference_outputs is None:
+                reference_outputs = result['outputs']
+            else:
+                print(f"    {compare_outputs(reference_outputs, result['outputs'])}")
+
+
+def compare_outputs(reference_outputs, outputs):
+    """
+    Compare the labels (in the order of their scores) and the scores of the sample values with the reference
+    """
+    same_labels = all(reference['labels'] == output['labels'] for reference, output in zip(reference_outputs, outputs))
+    score_difference = max(abs(reference_score - dict(zip(output['labels'], output['scores']))[label])
+                           for reference, output in zip(reference_outputs, outputs)
+                           for label, reference_score in zip(reference['labels'], reference['scores']))
+    return (f"same labels as {list(loading_modes)[0]} (cold): {same_labels}, "
+            f"max score difference: {score_difference:.2e}")
+
+
+def measure_loading(mode):
+    """
+    Runs in the benchmark's subprocess: load the model, classify a few values and print the measures as json
+    """
+    import torch  # imported before measuring, so the memory of the libraries is in 'before'
+    import transformers
+
+    Constants.classifier_mmap_weights = loading_modes[mode]
+    safetensors_path = get_safetensors_path(Classifier.model_directory)
+    if loading_modes[mode] and not os.path.exists(safetensors_path):
+        raise FileNotFoundError(f"{safetensors_path} was not found, "
+                                f"run python -m _SourceCode.ToolsUtils.MemoryMappedWeights first")
+
+    result = {'before': MemoryUsage.get_memory_usage()}
+    start_time = time.perf_counter()
+    classifier = Classifier.create_zero_shot_classifier(Constants.classifier_quantized)
+    result['load_time'] = time.perf_counter() - start_time
+    result['loaded'] = MemoryUsage.get_memory_usage()
+
+    start_time = time.perf_counter()
+    with torch.inference_mode():
+        outputs = classifier(sample_entities, candidate_labels=sample_labels, multi_label=True)
+    result['classify_time'] = time.perf_counter() - start_time
+    result['classified'] = MemoryUsage.get_memory_usage()
+    result['outputs'] = [{'labels': output['labels'], 'scores': output['scores']} for output in outputs]
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        measure_loading(sys.argv[1])
+    else:
+        run_benchmark()
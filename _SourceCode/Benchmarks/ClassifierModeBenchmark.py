@@ -0,0 +1,26 @@
+import sys
+
+from _SourceCode import Constants
+from _SourceCode.Benchmarks.ClassifierQuantizationBenchmark import compare_classifiers
+from _SourceCode.ToolsUtils import Classifier
+
+"""
+Benchmark of the embedding classifier (Constants.classifier_mode = 'embedding') against the zero shot NLI pipeline.
+Both classify the same sample locations and NRPs as ClassifierQuantizationBenchmark.py, without the classification
+cache, and the latency, the speed-up of the embedding classifier and the agreement of its top labels with the NLI
+labels are reported. Both use the quantization set in Constants.classifier_quantized.
+The BART model must be in _Resources/facebook_bart_large_mnli (see README.md).
+
+Run from the root folder:
+    python -m _SourceCode.Benchmarks.ClassifierModeBenchmark [number of runs]
+"""
+
+
+def run_benchmark(runs=3):
+    compare_classifiers(('nli', lambda: Classifier.create_zero_shot_classifier(Constants.classifier_quantized)),
+                        ('embedding', lambda: Classifier.create_embedding_classifier(Constants.classifier_quantized)),
+                        runs)
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
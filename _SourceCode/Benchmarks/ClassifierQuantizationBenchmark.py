@@ -0,0 +1,104 @@
+import sys
+import time
+
+from _SourceCode import Constants
+from _SourceCode.Anonymization.pseudonymization_methods.Location_Pseudonymization import location_labels, \
+    get_locations_to_classify
+from _SourceCode.Anonymization.pseudonymization_methods.NRP_Pseudonymization import nrp_types, get_nrps_to_classify
+from _SourceCode.ToolsUtils import Classifier
+
+"""
+Benchmark of the int8 quantized zero shot model (Constants.classifier_quantized) against the fp32 model.
+Both models classify the same locations (with location_labels) and NRPs (with nrp_types) without the classification
+cache. The latency of each model, the speed-up and the agreement of the top labels are reported, with the entities
+whose top label differs.
+With thread counts, the model set in Constants.py (classifier_quantized) is compared instead with each number of
+intra-op threads against torch's default number of threads, to choose classifier_threads.
+The BART model must be in _Resources/facebook_bart_large_mnli (see README.md).
+
+Run from the root folder:
+    python -m _SourceCode.Benchmarks.ClassifierQuantizationBenchmark [number of runs] [thread counts...]
+"""
+
+sample_locations = ['California', 'Los Angeles', 'San Quentin', 'Sacramento', 'Mexico', 'Texas', 'Fresno',
+                    '1515 S Street', 'Main Street', '95814', 'zip code 90012', 'Oregon', 'Guadalajara', 'Vietnam',
+                    'Bakersfield', 'Chino', 'Soledad', 'El Salvador', 'the valley', 'Central Avenue']
+sample_nrps = ['Mexican', 'Mexicans', 'Christian', 'Catholic', 'Muslim', 'Buddhist', 'Democrat', 'Republican',
+               'Hispanic', 'African American', 'Spanish', 'English', 'Vietnamese', 'Jewish', 'Native American',
+               'Latino', 'Baptist', 'Filipino', 'Armenian', 'conservative']
+
+
+def run_benchmark(runs=3):
+    compare_classifiers(('fp32', lambda: Classifier.create_zero_shot_classifier(quantized=False)),
+                        ('int8', lambda: Classifier.create_zero_shot_classifier(quantized=True)), runs)
+
+
+def run_thread_benchmark(thread_counts, runs=3):
+    import torch
+
+    default_threads = torch.get_num_threads()
+    for threads in thread_counts:
+        compare_classifiers((f'{default_threads} threads (default)', lambda: _create_classifier(default_threads)),
+                            (f'{threads} threads', lambda: _create_classifier(threads)), runs)
+
+
+def _create_classifier(threads):
+    Constants.classifier_threads = threads  # set by _prepare_for_inference
+    return Classifier.create_zero_shot_classifier(Constants.classifier_quantized)
+
+
+def compare_classifiers(reference, candidate, runs=3):
+    """
+    Classify the sample locations and NRPs with 2 classifiers, given as (name, function creating the classifier),
+    and output their latency, the speed-up of the candidate and the agreement of its top labels with the reference
+    """
+    if not Classifier.is_classifier_available():
+        return
+
+    label_sets = {  # the values as they are sent to the model, each one once
+        'LOCATION': (list(dict.fromkeys(get_locations_to_classify(sample_locations))), location_labels),
+        'NRP': (list(dict.fromkeys(get_nrps_to_classify(sample_nrps))), nrp_types),
+    }
+
+    timings = {}
+    top_labels = {}
+    for classifier_name, create_classifier in [reference, candidate]:
+        print(f'Loading the {classifier_name} classifier...')
+        classifier = create_classifier()
+
+        # warm up (the first call allocates the buffers)
+        Classifier.run_classifier(classifier, sample_locations[:2], location_labels)
+
+        start_time = time.perf_counter()
+        for _ in range(runs):
+            top_labels[classifier_name] = {name: Classifier.run_classifier(classifier, entities, labels)
+                                           for name, (entities, labels) in label_sets.items()}
+        timings[classifier_name] = (time.perf_counter() - start_time) / runs
+        del classifier
+
+    reference_name, candidate_name = reference[0], candidate[0]
+    entity_count = sum(len(entities) for entities, _ in label_sets.values())
+    for classifier_name, seconds in timings.items():
+        print(f'{classifier_name}: {seconds:.3f}s for {entity_count} entities '
+              f'({seconds / entity_count * 1000:.1f} ms per entity)')
+    if timings[candidate_name]:
+        print(f"speedup: x{timings[reference_name] / timings[candidate_name]:.2f}")
+
+    for name, (entities, _) in label_sets.items():
+        reference_labels = top_labels[reference_name][name]
+        candidate_labels = top_labels[candidate_name][name]
+        same_labels = sum(reference_label == candidate_label
+                          for reference_label, candidate_label in zip(reference_labels, candidate_labels))
+        print(f'{name}: same top label for {same_labels}/{len(entities)} entities '
+              f'({same_labels / len(entities) * 100:.1f}%)')
+        for entity, reference_label, candidate_label in zip(entities, reference_labels, candidate_labels):
+            if reference_label != candidate_label:
+                print(f'    {entity}: {reference_label} ({reference_name}) / {candidate_label} ({candidate_name})')
+
+
+if __name__ == '__main__':
+    run_count = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    if len(sys.argv) > 2:
+        run_thread_benchmark([int(threads) for threads in sys.argv[2:]], run_count)
+    else:
+        run_benchmark(run_count)
@@ -0,0 +1,126 @@
+import random
+import sys
+import time
+
+from _SourceCode import Constants
+from _SourceCode.AnnotationHelpers.AnnotationReplace import insert_into_annotations, get_replacement_by_annotation_id, \
+    get_person_replacement
+from _SourceCode.HelperFunctions import clean_name
+from _SourceCode.ModelClasses.Annotation import Annotation
+from _SourceCode.ModelClasses.NameEntity import NameEntity, name_entities_by_annotation_id, name_entities_by_name
+
+"""
+Benchmark of the replacement lookup of insert_into_annotations on a synthetic transcript.
+It compares the lookup by scanning the list of NameEntity of the label for every annotation (how the replacements were
+looked up before) with the lookup in the dicts returned by the pseudonymization methods.
+No model is needed: the NameEntity items are generated with their replacement already filled.
+
+Run from the root folder:
+    python -m _SourceCode.Benchmarks.ReplacementLookupBenchmark [number of annotations]
+"""
+
+# name of the NameEntity list of each label (the arguments insert_into_annotations took before)
+label_arguments = {
+    Constants.LABEL_PERSON: 'names',
+    Constants.LABEL_LOCATION: 'locations',
+    Constants.LABEL_ORGANIZATION: 'organizations',
+    Constants.LABEL_NRP: 'nrps',
+    Constants.LABEL_DATE: 'dates',
+    Constants.LABEL_TIME: 'times',
+    Constants.LABEL_ID: 'ids',
+    Constants.LABEL_SPELLED_NAME: 'spelled_names',
+    Constants.LABEL_AGE: 'ages',
+    Constants.LABEL_HEIGHT: 'heights',
+    Constants.LABEL_PHONE_NUMBER: 'phone_numbers',
+    Constants.LABEL_EMAIL_ADDRESS: 'emails',
+    Constants.LABEL_URL: 'urls',
+    Constants.LABEL_SPELLED_OUT_ITEM: 'spelled_out_items',
+}
+
+first_names = ['John', 'Mary', 'Robert', 'Patricia', 'Michael', 'Linda', 'David', 'Susan', 'James', 'Karen']
+last_names = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Lopez', 'Wilson']
+
+
+def generate_synthetic_annotations(annotation_count, seed=0):
+    """
+    Return the annotations of a synthetic transcript and the NameEntity lists of each label (by argument name)
+    """
+    random.seed(seed)
+    annotations = []
+    entities = {argument: [] for argument in label_arguments.values()}
+
+    print(f'Synthetic transcript with {annotation_count} annotations')
+    start = 0
+    for index in range(annotation_count):
+        label = random.choice(list(label_arguments))
+        if label == Constants.LABEL_PERSON:
+            preview = f'{random.choice(first_names)} {random.choice(last_names)}'
+        else:
+            preview = f'{label.lower()} value {index}'
+        annotation = Annotation(start=start, end=start + len(preview), label=label, preview=preview, source='benchmark')
+        start += len(preview) + 10
+        annotations.append(annotation)
+
+        if label == Constants.LABEL_PERSON:
+            entities['names'].append(NameEntity(name=clean_name(preview).title(), name_replacement=f'[PERSON_{index}]',
+                                                annotation_id=annotation.annotation_id))
+        else:
+            entities[label_arguments[label]].append(NameEntity(name=preview, name_replacement=f'[{label}_{index}]',
+                                                               annotation_id=annotation.annotation_id))
+    return annotations, entities
+
+
+def run_benchmark(annotation_count=20000):
+    annotations, entities = generate_synthetic_annotations(annotation_count)
+
+    # before: scan the list of the label for every annotation
+    start_time = time.perf_counter()
+    _insert_with_list_scan(annotations, entities)
+    list_scan_time = time.perf_counter() - start_time
+    list_scan_replacements = [annotation.replacement for annotation in annotations]
+
+    for annotation in annotations:
+        annotation.replacement = ""
+
+    # now: a single lookup in the dict of the label
+    start_time = time.perf_counter()
+    entities_by_label = {}
+    replacement_getters = {}
+    for label, argument in label_arguments.items():
+        if label == Constants.LABEL_PERSON:
+            entities_by_label[label] = name_entities_by_name(entities[argument])
+            replacement_getters[label] = get_person_replacement
+        else:
+            entities_by_label[label] = name_entities_by_annotation_id(entities[argument])
+            replacement_getters[label] = get_replacement_by_annotation_id
+    insert_into_annotations(annotations, entities_by_label, replacement_getters)
+    dict_lookup_time = time.perf_counter() - start_time
+    dict_lookup_replacements = [annotation.replacement for annotation in annotations]
+
+    print(f'list scan:   {list_scan_time:.3f}s')
+    print(f'dict lookup: {dict_lookup_time:.3f}s (including building the dicts)')
+    if dict_lookup_time:
+        print(f'speedup:     x{list_scan_time / dict_lookup_time:.1f}')
+    print(f'same replacements: {list_scan_replacements == dict_lookup_replacements}')
+
+
+def _insert_with_list_scan(annotations, entities):
+    """
+    Lookup of the replacements by scanning the NameEntity lists, as insert_into_annotations did with lists
+    """
+    for annotation in annotations:
+        if annotation.label == Constants.LABEL_PERSON:
+            name = clean_name(annotation.preview).title()
+            name_entity = next((person for person in entities['names'] if person.name == name), None)
+            if name_entity is not None and name_entity.name_replacement:
+                annotation.replacement = name_entity.name_replacement.upper() if annotation.preview.isupper() else name_entity.name_replacement.title()
+            continue
+
+        items = entities[label_arguments[annotation.label]]
+        entity = next((item for item in items if item.annotation_id == annotation.annotation_id), None)
+        if entity is not None:
+            annotation.replacement = entity.name_replacement
+
+
+if __name__ == '__main__':
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+
+from _SourceCode import AnnotationUtils, Constants, TranscriptSharding
+from _SourceCode.AnnotationHelpers import AnnotationCleaner
+from _SourceCode.FileDataExtraction.TextExtraction import extract_text_from_txt_file
+from _SourceCode.ToolsUtils import ModelManager
+
+"""
+Check of the sharding of a long transcript (see TranscriptSharding.py).
+The transcript is annotated as a whole, then shard by shard (one shard after the other in this process, like the
+workers would) and the raw results of each tool and the cleaned annotations of both runs are compared. Both runs are
+expected to be the same; a difference is listed with its distance to the closest edge of a shard.
+The time of the whole run and the total time of the shards are also reported.
+The transcript is taken from the hearings folder, by default the longest one. The NER tools must be installed
+(see README.md).
+
+Run from the root folder:
+    python -m _SourceCode.Benchmarks.TranscriptShardingBenchmark [transcript file] [shard size]
+"""
+
+
+def run_benchmark(file=None, shard_size=None):
+    directory = Constants.hearings_txt_directory
+    if file is None:
+        file = max([file for file in os.listdir(directory) if file.endswith(Constants.text_format)],
+                   key=lambda file: os.path.getsize(os.path.join(directory, file)))
+    if shard_size:
+        Constants.shard_size = shard_size
+
+    import nltk
+    nltk.download('punkt')  # for StanfordNER
+
+    text = extract_text_from_txt_file(file)
+    shard_ranges = TranscriptSharding.split_into_shards(text)
+    print(f"{file}: {len(text)} characters, {len(shard_ranges)} shards of at most {Constants.shard_size} characters")
+    ModelManager.preload([AnnotationUtils.tool_models[tool] for tool in AnnotationUtils.tools])  # not in the timings
+
+    start_time = time.perf_counter()
+    whole_results = AnnotationUtils._get_tool_results(text)
+    whole_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    sharded_results = TranscriptSharding.merge_shard_results(
+        [AnnotationUtils._get_tool_results(text, text_range) for text_range in shard_ranges])
+    shards_time = time.perf_counter() - start_time
+    print(f"whole transcript: {whole_time:.2f}s, all the shards: {shards_time:.2f}s\n")
+
+    shard_edges = [start for start, _ in shard_ranges[1:]]
+    same = True
+    for tool in AnnotationUtils.tools:
+        same &= print_differences(tool, whole_results[tool], sharded_results[tool], shard_edges)
+    same &= print_differences('cleaned annotations', get_cleaned_annotations(text, whole_results),
+                              get_cleaned_annotations(text, sharded_results), shard_edges)
+    print(f"\nsame results with and without shards: {same}")
+    return same
+
+
+def get_cleaned_annotations(text, tool_results):
+    """
+    The annotations of the transcript as [start, end, label] after the filtering, the merging and the cleaning
+    (see AnnotationUtils._annotations_from_tool_results)
+    """
+    annotations, _, _ = AnnotationUtils._combine_tool_results(text, tool_results)
+    unique_annotations, _ = AnnotationCleaner.handle_duplicates_overlaps(annotations)
+    return [[int(annotation.start), int(annotation.end), annotation.label] for annotation in unique_annotations]
+
+
+def print_differences(name, whole_results, sharded_results, shard_edges):
+    """
+    Output how many results of the whole run the sharded run also has, and the results that only one run has.
+    Return whether both runs have the same results.
+    """
+    whole_set = {tuple(result) for result in whole_results}
+    sharded_set = {tuple(result) for result in sharded_results}
+    print(f"{name}: {len(whole_set & sharded_set)}/{len(whole_set)} results of the whole transcript found with the "
+          f"shards, {len(sharded_set - whole_set)} results only found with the shards")
+
+    for run_name, results in [('whole transcript', whole_set - sharded_set), ('shards', sharded_set - whole_set)]:
+        for result in sorted(results):
+            distance = min(abs(result[0] - edge) for edge in shard_edges) if shard_edges else None
+            print(f"    only with the {run_name}: {list(result)} ({distance} characters from the edge of a shard)")
+    return whole_set == sharded_set
+
+
+if __name__ == '__main__':
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else None)
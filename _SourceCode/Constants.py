@@ -2,11 +2,43 @@ input_hearings_directory = '.\\Hearing transcripts (PDF)'
 hearings_txt_directory = '.\\Hearing transcripts (Text)'
 output_json_directory = '.\\Annotations JSON'
 output_json_file = 'processed_annotations.json'
+output_jsonl_file = 'processed_annotations.jsonl'  # append-only store, compacted into output_json_file
+output_jsonl_index_file = 'processed_annotations.index.json'  # file -> position of its record in the store
+annotation_cache_directory = '.\\Annotations Cache'
+raw_results_cache_directory = '.\\Annotations Cache\\Raw NER results'
 annotations_dir = '.\\Annotations Output'
+run_journal_file = '.\\Annotations Output\\run_journal.jsonl'
 resources_folder = '.\\_Resources'
 text_format = '.txt'
 presidio_threshold = 0.85
+spacy_model = 'en_core_web_trf'  # https://spacy.io/models/en#en_core_web_trf
+spacy_disabled_components = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"]
+spacy_split_utterances = True  # run spaCy on each utterance (line) instead of the whole transcript as 1 Doc
+spacy_batch_size = 64  # utterances per nlp.pipe batch
+spacy_n_process = 1  # processes used by nlp.pipe, keep 1 with --workers/--pipeline (worker processes can't have children)
+spacy_files_per_batch = 4  # transcripts whose utterances are batched together in --pipeline mode
+chunk_max_size = 100000  # max characters of text given to Presidio/spaCy at once (spaCy's nlp.max_length is 1000000)
+chunk_overlap = 2000  # characters (whole utterances) repeated at the start of the next chunk
+shard_min_size = 300000  # with --shard, transcripts longer than this (characters) are split across the workers
+shard_size = 100000  # characters (whole utterances) of a shard
+stanford_ner_jar = '.\\_Resources\\stanford-ner\\stanford-ner-4.2.0.jar'
+stanford_ner_model = '.\\_Resources\\stanford-ner\\english.all.3class.distsim.crf.ser.gz'
+stanford_ner_java_options = '-mx1000m'
+stanford_ner_workers = 1  # number of JVMs in the StanfordNER server pool
+stanford_ner_startup_timeout = 120  # seconds to wait for a JVM to load the model
+stanford_ner_max_retries = 1  # retries of a request after restarting a crashed JVM
+stanford_ner_request_timeout = 60  # seconds to wait for the answer of a JVM to a chunk before restarting it
+stanford_ner_chunk_size = 20000  # max characters (whole utterances) of text tagged by a JVM in one request
 output_anonymization = '.\\Anonymization Output\\anonymization_output_'
+classification_cache_file = '.\\Annotations Cache\\zero_shot_classifications.sqlite'
+classification_cache_max_entries = 200000  # least recently used classifications are removed above this
+classifier_mode = 'nli'  # 'nli': zero shot pipeline, 'embedding': similarity of the entity and label embeddings
+classifier_batch_size = 16  # entities sent through the zero shot model at once
+embedding_classifier_batch_size = 64  # entities encoded at once by the embedding classifier
+gazetteer_folder = '.\\_Resources\\gazetteer'  # lists of places giving the type of a location without the model
+classifier_quantized = False  # int8 dynamic quantization of the zero shot model (faster on CPU)
+classifier_threads = None  # intra-op threads of the zero shot model, None: torch's default (not tuned, see README)
+classifier_mmap_weights = True  # memory map model.safetensors instead of loading pytorch_model.bin, if it exists
 first_page_names_headers = [
     "PANEL PRESENT",
     "OTHERS PRESENT",
@@ -57,6 +89,12 @@ worded_numbers_pattern = r'\b(?:zero|one|two|three|four|five|six|seven|eight|nin
 
 split_string_pattern = r'\b\d{1,2}/\d{1,2}/\d{4}\b|\w+|[^\w\s]|\s'
 split_string_pattern_for_file = r'\d{4}-\d{1,2}-\d{1,2}|\b\d{1,2}/\d{1,2}/\d{4}\b|\w+|[^\w\s]|\s'
+spelled_out_name_pattern = r'\b([A-Z]([-—])\s?[A-Z](\s?\2\s?[A-Z])*)\b'  # symbols between letters (J-O-H-N)
+id_patterns = [  # simple ID patterns like 12345 or AB1234
+    r'\b[A-Z]{0,4}\d{5,10}\b',
+    r'\b[A-Z]{1,4}\d{4,10}\b',
+    r'\b[A-Z]{1,4}\d{2,5}-(?!\d)'  # For cut-off IDs
+]
 
 LABEL_SPELLED_NAME = 'SPELLED_NAME'
 LABEL_ID = 'ID'
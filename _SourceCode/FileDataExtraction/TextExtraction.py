@@ -221,6 +221,21 @@ def utterances_one_line(text):
     return '\n\n'.join(formatted_text).replace("    ", " ").replace("   ", " ").replace("  ", " ")
 
 
+def utterance_positions(text):
+    """
+    The text files have each utterance on 1 line (see utterances_one_line).
+    Return a list of (start, utterance) with the position where each utterance starts in the whole text.
+    Empty lines are skipped.
+    """
+    positions = []
+    start = 0
+    for line in text.split('\n'):
+        if line.strip():
+            positions.append((start, line))
+        start += len(line) + 1  # + the '\n'
+    return positions
+
+
 def is_pdf_corrupted(file_path):
     """
     Checks if the current PDF file is corrupted or not.
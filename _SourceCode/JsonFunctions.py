@@ -1,66 +1,153 @@
 import os
 import json
-import shutil
 
-from _SourceCode import Constants, HelperFunctions
+from _SourceCode import Constants
+
+"""
+The annotations of the transcripts are kept in an append-only store: a JSON lines file with 1 record per transcript
+({'file': ..., 'annotations': [...]}), appended as soon as the transcript is done. Nothing that was written before
+is read or rewritten, and a crash can only cut the last record, which is ignored when the store is read.
+When a transcript is annotated again, its new record is appended and the last record of a file wins.
+The store can be compacted into the legacy single json file (processed_annotations.json).
+An index (file -> byte offset of its last record) is kept next to the store to read the record of a file directly.
+"""
+
+
+def get_annotation_store_path():
+    return os.path.join(Constants.output_json_directory, Constants.output_jsonl_file)
+
+
+def get_annotation_index_path():
+    return os.path.join(Constants.output_json_directory, Constants.output_jsonl_index_file)
+
+
+def get_legacy_json_path():
+    return os.path.join(Constants.output_json_directory, Constants.output_json_file)
+
+
+def annotation_data_exists():
+    return os.path.exists(get_annotation_store_path()) or os.path.exists(get_legacy_json_path())
 
 
 def get_data_from_annotation_json():
     """
-    Get data from the annotation output json file
+    Get data from the annotation store, the last record of each file wins.
+    If there is no store yet, read the legacy json file.
+    """
+    if not os.path.exists(get_annotation_store_path()):
+        with open(get_legacy_json_path(), 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    records = {}  # file -> record, a file keeps the position of its first record
+    for _, record in _read_annotation_store():
+        records[record['file']] = record
+    return list(records.values())
+
+
+def get_annotation_index():
+    """
+    Index of the annotation store: file -> byte offset of the last record of the file in the store.
+    The index is kept next to the store and is only built again (in 1 pass over the store) when the store changed.
+    """
+    # keep the transcripts of a legacy json file written by an older version
+    if not os.path.exists(get_annotation_store_path()) and os.path.exists(get_legacy_json_path()):
+        compact_annotation_store()
+
+    store_stat = os.stat(get_annotation_store_path())
+    store_signature = [store_stat.st_size, store_stat.st_mtime_ns]
+
+    index_path = get_annotation_index_path()
+    if os.path.exists(index_path):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index_data = json.load(f)
+            if index_data['store'] == store_signature:
+                return index_data['offsets']
+        except (OSError, ValueError, KeyError):
+            pass  # build it again
+
+    offsets = {}
+    for offset, record in _read_annotation_store():
+        offsets[record['file']] = offset
+    _write_file_atomically(index_path, json.dumps({'store': store_signature, 'offsets': offsets}))
+    return offsets
+
+
+def read_annotation_record(offset):
+    """
+    Read the record at the given byte offset of the annotation store (see get_annotation_index)
     """
-    file_path = os.path.join(Constants.output_json_directory, Constants.output_json_file)
-    with open(file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
-    return data
+    with open(get_annotation_store_path(), 'rb') as store:
+        return _read_record_at(store, offset)
+
+
+def _read_record_at(store, offset):
+    store.seek(offset)
+    return json.loads(store.readline())
+
 
+def _read_annotation_store():
+    """
+    Yield (byte offset, record) for every complete record of the store
+    """
+    with open(get_annotation_store_path(), 'rb') as store:
+        offset = 0
+        for line in store:
+            try:
+                yield offset, json.loads(line)
+            except ValueError:
+                pass  # record cut by a crash
+            offset += len(line)
 
 
 def write_data_to_json(data):
     """
-    Write the data into a json file
+    Append the data of a transcript to the annotation store
     """
     directory = Constants.output_json_directory
-    output_file_path = os.path.join(Constants.output_json_directory, Constants.output_json_file)
-
     if not os.path.exists(directory):
         os.makedirs(directory)
-        data = [data]
-    else:
-        json_file_path = os.path.join(directory, Constants.output_json_file)
-        if os.path.exists(json_file_path):  # if file exists, append the data to the already existing file
-            data = _update_json_data(json_file_path, data)
-        else:  # otherwise, clear the directory for a new json file
-            HelperFunctions.clear_directory(directory)
-            data = [data]
-
-    with open(output_file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4)
-
-def _update_json_data(json_file_path, new_data_dict):
+
+    # keep the transcripts of a legacy json file written by an older version
+    if not os.path.exists(get_annotation_store_path()) and os.path.exists(get_legacy_json_path()):
+        compact_annotation_store()
+
+    line = (json.dumps(data, separators=(',', ':')) + '\n').encode('utf-8')
+    with open(get_annotation_store_path(), 'a+b') as f:
+        # if the last record was cut by a crash, start on a new line so that this one stays readable
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+        f.write(line)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def compact_annotation_store():
     """
-    Update the JSON file by appending new data or replacing annotations for existing files.
+    Keep only the last record of each file in the store and write the legacy json file (processed_annotations.json)
+    from it. Both files are replaced atomically.
+    Returns the number of transcripts.
     """
+    data = get_data_from_annotation_json()
 
-    if os.path.exists(json_file_path): # Check if the file exists
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            current_json_data = json.load(f)  # get data from the JSON file
-    else:
-        # If the file doesn't exist, start with an empty list
-        current_json_data = []
+    store_path = get_annotation_store_path()
+    _write_file_atomically(store_path, ''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in data))
 
-    file_found = False  # check if the file is already in the JSON data
-    new_file_name = new_data_dict['file']
+    legacy_path = get_legacy_json_path()
+    _write_file_atomically(legacy_path, json.dumps(data, indent=4))
+    return len(data)
 
-    # Go through the existing data to find if the file already exists
-    for entry in current_json_data:
-        if entry['file'] == new_file_name:
-            # If the file exists, replace the annotations
-            entry['annotations'] = new_data_dict['annotations']
-            file_found = True
-            break
 
-    if not file_found:  # file in json not found, append the new data
-        current_json_data.append(new_data_dict)
+def _write_file_atomically(file_path, content):
+    directory = os.path.dirname(file_path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
 
-    return current_json_data
+    temp_file = file_path + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_file, file_path)
@@ -1,6 +1,6 @@
 import re
 
-from _SourceCode.ToolsUtils import PresidioRecognizers
+from _SourceCode import Constants
 
 
 class Annotation:
@@ -96,11 +96,11 @@ class Annotation:
         Annotation: PERSON | John J-O-H-N
         So we must separate the name from the spelled name
         """
-        if re.search(PresidioRecognizers.SpelledOutNamesRecognizer.pattern, self.preview):
-            spelled_out_name_part = re.search(PresidioRecognizers.SpelledOutNamesRecognizer.pattern,
+        if re.search(Constants.spelled_out_name_pattern, self.preview):
+            spelled_out_name_part = re.search(Constants.spelled_out_name_pattern,
                                               self.preview).group()
             split_ann_preview = self.preview.split(
-                re.search(PresidioRecognizers.SpelledOutNamesRecognizer.pattern, self.preview).group())
+                re.search(Constants.spelled_out_name_pattern, self.preview).group())
             if split_ann_preview:
                 self.preview = split_ann_preview[0]
                 self.end = self.end - len(spelled_out_name_part) - 1
@@ -0,0 +1,63 @@
+from _SourceCode.ModelClasses.Annotation import Annotation
+
+
+class FileAnnotations:
+    """
+    Class that contains the result of gathering the annotations of a single hearing file.
+    file is the name of the hearing file without the format
+    unique_annotations are the correct annotations after the cleaning
+    false_annotations are the annotations filtered out by the checks of each tool
+    filtered_out_annotations are the annotations removed in the final cleaning (duplicates, overlaps...)
+    total_unfiltered_annotations is the # of annotations detected by the tools before any filtering
+    """
+
+    def __init__(self, file, unique_annotations, false_annotations, filtered_out_annotations,
+                 total_unfiltered_annotations):
+        self.file = file
+        self.unique_annotations = unique_annotations
+        self.false_annotations = false_annotations
+        self.filtered_out_annotations = filtered_out_annotations
+        self.total_unfiltered_annotations = total_unfiltered_annotations
+
+    def __repr__(self):
+        return (f"FileAnnotations(file='{self.file}', unique_annotations={len(self.unique_annotations)}, "
+                f"false_annotations={len(self.false_annotations)}, "
+                f"filtered_out_annotations={len(self.filtered_out_annotations)})")
+
+    def to_json_data(self):
+        """
+        The data of this file as it is written in the annotation json file
+        """
+        return {
+            'file': self.file,
+            'annotations': [ann.to_dict() for ann in self.unique_annotations],
+        }
+
+    def to_dict(self):
+        """
+        All the data of this file, to be stored and rebuilt later with file_annotations_from_dict
+        """
+        return {
+            'file': self.file,
+            'unique_annotations': [ann.to_dict() for ann in self.unique_annotations],
+            'false_annotations': [ann.to_dict() for ann in self.false_annotations],
+            'filtered_out_annotations': [ann.to_dict() for ann in self.filtered_out_annotations],
+            'total_unfiltered_annotations': self.total_unfiltered_annotations,
+        }
+
+
+def file_annotations_from_dict(data, file=None):
+    """
+    Rebuild the FileAnnotations from the data of FileAnnotations.to_dict (optionally under another file name)
+    """
+    return FileAnnotations(
+        file=data['file'] if file is None else file,
+        unique_annotations=_annotations_from_dicts(data['unique_annotations']),
+        false_annotations=_annotations_from_dicts(data['false_annotations']),
+        filtered_out_annotations=_annotations_from_dicts(data['filtered_out_annotations']),
+        total_unfiltered_annotations=data['total_unfiltered_annotations'])
+
+
+def _annotations_from_dicts(annotation_dicts):
+    return [Annotation(start=item['start'], end=item['end'], label=item['label'], preview=item['preview'],
+                       source=item['source']) for item in annotation_dicts]
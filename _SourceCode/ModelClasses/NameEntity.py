@@ -29,3 +29,23 @@ class NameEntity:
 
         return "NameEntity(" + ", ".join(values) + ")"
 
+
+def name_entities_by_annotation_id(name_entities):
+    """
+    Index the NameEntity items by annotation_id so that the replacement of an annotation is found directly.
+    If several items have the same annotation_id, the first one is kept.
+    """
+    indexed_entities = {}
+    for name_entity in name_entities:
+        indexed_entities.setdefault(name_entity.annotation_id, name_entity)
+    return indexed_entities
+
+
+def name_entities_by_name(name_entities):
+    """
+    Index the NameEntity items by name, if several items have the same name, the first one is kept
+    """
+    indexed_entities = {}
+    for name_entity in name_entities:
+        indexed_entities.setdefault(name_entity.name, name_entity)
+    return indexed_entities
@@ -0,0 +1,29 @@
+class PseudonymizationContext:
+    """
+    State of the pseudonymization of a single hearing file, passed to every pseudonymization method.
+    'name_mapping' maps the original names to their pseudonymized names (filled by PERSON, used by SPELLED_NAME and
+        the file name)
+    'org_mapping' maps the original organizations to their pseudonymized values
+    'id_mapping' maps the numbers of the IDs to their pseudonymized values
+    'counters' has the sequential numbers of the pseudonymized values (PERSON_X, City_X...) by counter name,
+        they all start at 1
+
+    Nothing is shared between 2 files, so files can be pseudonymized in any order or at the same time.
+    """
+    def __init__(self):
+        self.name_mapping = {}
+        self.org_mapping = {}
+        self.id_mapping = {}
+        self.counters = {}
+
+    def next_count(self, counter_name):
+        """
+        Return the current value of the counter and increment it
+        """
+        count = self.counters.get(counter_name, 1)
+        self.counters[counter_name] = count + 1
+        return count
+
+    def __repr__(self):
+        return (f"PseudonymizationContext(names={len(self.name_mapping)}, organizations={len(self.org_mapping)}, "
+                f"ids={len(self.id_mapping)}, counters={self.counters})")
@@ -0,0 +1,186 @@
+import gc
+import multiprocessing
+import os
+
+from _SourceCode import AnnotationUtils, TranscriptSharding
+from _SourceCode.ToolsUtils import ModelManager, MemoryUsage
+from _SourceCode.ToolsUtils.StanfordNER import STANFORD_NER_SERVER
+
+"""
+Runs the annotation of the hearing files in a pool of processes.
+Every process loads the models once when it starts (so they are warm for every file it gets) and takes
+the next file from the shared queue of the pool as soon as it's done with the previous one.
+The results are sent back to the main process which writes them into the json file and the statistics.
+
+With preload_models, the read-only models (the Presidio analyzer with its spaCy model and the spaCy pipeline) are
+loaded once in the main process and the workers are forked from it: they share the memory pages of the models
+(copy on write) instead of each loading its own copy. To keep the pages shared:
+- the objects of the main process are frozen (gc.freeze) before forking, so the garbage collector of the workers never
+  writes into them
+- the workers run the models without autograd, so no gradient state is attached to the shared weights
+Only the pages a worker writes (the strings spaCy adds to its vocabulary, the reference counts of the objects it uses)
+become its own. The unique memory (uss) and the proportional memory (pss) of each worker are reported at the end to
+size the number of workers.
+
+With shard_transcripts, the long transcripts are split into shards of whole utterances which are annotated by
+different workers (see TranscriptSharding.py), so that a huge transcript doesn't leave the other workers idle at the
+end of the run. The shards are queued first, the main process merges and cleans the results of a transcript once all
+its shards are done.
+"""
+
+# models that each worker loads when it starts
+worker_models = [AnnotationUtils.tool_models[tool] for tool in AnnotationUtils.tools]
+# models that can be loaded in the main process and shared with the forked workers (the StanfordNER server is a pool
+# of JVMs reached over sockets, every worker starts its own)
+shared_models = [model for model in worker_models if model != STANFORD_NER_SERVER]
+
+_worker_options = {}
+
+
+def annotate_files_in_processes(files, directory, workers, ignore_1st_page_info, create_annotation_output_file,
+                                insert_labels_in_text, write_statistics, preload_models=False,
+                                shard_transcripts=False):
+    """
+    Annotate the files with a pool of processes.
+    Yields the FileAnnotations of each file as soon as it's done (not necessarily in the order of the files)
+    preload_models - load the read-only models in this process and fork the workers so that they share them
+                     (only where processes can be forked, not on Windows)
+    shard_transcripts - split the transcripts longer than shard_min_size into shards annotated by several workers
+    """
+    options = {
+        'directory': directory,
+        'ignore_1st_page_info': ignore_1st_page_info,
+        'create_annotation_output_file': create_annotation_output_file,
+        'insert_labels_in_text': insert_labels_in_text,
+        'write_statistics': write_statistics,
+    }
+    worker_model_stats = {}
+    worker_memory_usage = {}
+
+    context = multiprocessing.get_context()
+    if preload_models:
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            _preload_shared_models()
+        else:
+            print("The workers can't be forked on this system, each worker loads its own models.")
+            preload_models = False
+
+    # a task is (index of the file, file, range of the shard or None for the whole file), the shards go first
+    shard_ranges = {}  # index of a sharded file -> ranges of its shards
+    if shard_transcripts:
+        for index, file in enumerate(files):
+            ranges = TranscriptSharding.get_shard_ranges(directory, file)
+            if len(ranges) > 1:
+                shard_ranges[index] = ranges
+    tasks = [(index, files[index], text_range) for index, ranges in shard_ranges.items() for text_range in ranges]
+    tasks += [(index, file, None) for index, file in enumerate(files) if index not in shard_ranges]
+    shard_results = {index: {} for index in shard_ranges}  # index of a sharded file -> range -> raw results
+
+    if shard_ranges:
+        print(f"Annotating {len(files)} files with {workers} processes, {len(shard_ranges)} long transcripts are "
+              f"split into {sum(len(ranges) for ranges in shard_ranges.values())} shards.\n")
+    else:
+        print(f"Annotating {len(files)} files with {workers} processes.\n")
+    try:
+        with context.Pool(processes=workers, initializer=_init_worker, initargs=(options,)) as pool:
+            for (index, file, text_range), result, worker_id, model_stats, memory_usage in pool.imap_unordered(
+                    _annotate_task, tasks):
+                worker_model_stats[worker_id] = model_stats
+                worker_memory_usage[worker_id] = memory_usage
+                if text_range is None:
+                    yield result
+                    continue
+
+                # the transcript is cleaned here once all its shards are done
+                shard_results[index][text_range] = result
+                if len(shard_results[index]) == len(shard_ranges[index]):
+                    results = shard_results.pop(index)
+                    yield TranscriptSharding.annotations_from_shards(
+                        file=file,
+                        file_number=index + 1,
+                        directory=directory,
+                        shard_results=[results[text_range] for text_range in shard_ranges[index]],
+                        create_annotation_output_file=create_annotation_output_file,
+                        insert_labels_in_text=insert_labels_in_text,
+                        write_statistics=write_statistics)
+
+            # let the workers exit normally so that they stop their StanfordNER servers
+            pool.close()
+            pool.join()
+    finally:
+        if preload_models:
+            gc.unfreeze()
+
+    for worker_id, model_stats in worker_model_stats.items():
+        print(f"\nWorker {worker_id}:")
+        ModelManager.print_model_report(model_stats)
+
+    _print_worker_memory_report(worker_memory_usage)
+
+
+def _preload_shared_models():
+    """
+    Load the shared models in the main process and freeze its objects before the workers are forked
+    """
+    print("Loading the models shared by the workers...")
+    ModelManager.preload(shared_models)
+
+    gc.collect()
+    gc.freeze()  # the workers' garbage collector won't touch (and copy) the pages of the objects loaded so far
+    print(f"Main process with the shared models: {MemoryUsage.format_memory_usage(MemoryUsage.get_memory_usage())}")
+
+
+def _print_worker_memory_report(worker_memory_usage):
+    """
+    Output the memory of each worker (measured after its last file): uss is the memory only the worker uses, the
+    sum of the pss of the workers is about the memory they take all together
+    """
+    print("\n---------WORKERS MEMORY---------")
+    for worker_id, memory_usage in worker_memory_usage.items():
+        print(f"Worker {worker_id}: {MemoryUsage.format_memory_usage(memory_usage)}")
+
+    pss_values = [memory_usage['pss'] for memory_usage in worker_memory_usage.values()]
+    if pss_values and None not in pss_values:
+        print(f"Total pss of the workers: {sum(pss_values) / 1024 ** 2:.0f} MB")
+
+
+def _init_worker(options):
+    """
+    Runs once in every worker process: keep the options and load the models (the ones preloaded by the main process
+    are already there)
+    """
+    _worker_options.update(options)
+    AnnotationUtils.skip_1st_page_info_presidio = options['ignore_1st_page_info']
+    _disable_autograd()
+    ModelManager.preload(worker_models)
+
+
+def _disable_autograd():
+    """
+    The models are only used for inference: without autograd no gradient state is kept with their weights
+    """
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_grad_enabled(False)
+
+
+def _annotate_task(task):
+    """
+    Runs in a worker process, annotate a single file (the FileAnnotations) or a shard of a transcript (the raw results
+    of the tools)
+    """
+    index, file, text_range = task
+    if text_range is None:
+        result = AnnotationUtils._annotations_for_file(
+            file=file,
+            file_number=index + 1,
+            directory=_worker_options['directory'],
+            create_annotation_output_file=_worker_options['create_annotation_output_file'],
+            insert_labels_in_text=_worker_options['insert_labels_in_text'],
+            write_statistics=_worker_options['write_statistics'])
+    else:
+        result = TranscriptSharding.annotate_shard(file, index + 1, _worker_options['directory'], text_range)
+    return task, result, os.getpid(), ModelManager.get_model_stats(), MemoryUsage.get_memory_usage()
@@ -0,0 +1,81 @@
+import json
+import os
+
+from _SourceCode import Constants
+from _SourceCode.ModelClasses.FileAnnotations import file_annotations_from_dict
+
+"""
+Journal of a GatherAnnotations run, to be able to resume it after a crash or after the process was killed.
+Every transcript is appended to the journal as soon as it's done, as 1 json line with its cache key and all its
+annotations (so that the statistics of all the files can be rebuilt). The line is flushed to the disk before the next
+transcript is recorded: a run that is killed loses at most the transcript that was being written, which is ignored
+when the journal is read.
+"""
+
+
+def start_new_journal():
+    """
+    Start the journal of a new run, the journal of the previous run is discarded
+    """
+    _make_journal_directory()
+    open(Constants.run_journal_file, 'w', encoding='utf-8').close()
+
+
+def load_journal():
+    """
+    Read the journal of the previous run.
+    Returns a dict: file name without the format -> (cache key, FileAnnotations)
+    """
+    finished_files = {}
+    if not os.path.exists(Constants.run_journal_file):
+        return finished_files
+
+    with open(Constants.run_journal_file, 'r', encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # the line that was being written when the run was killed
+            finished_files[entry['file']] = (entry['cache_key'], file_annotations_from_dict(entry))
+    return finished_files
+
+
+def resume_journal():
+    """
+    Read the journal of the previous run to continue it.
+    The journal is written again without the line that was cut when the run was killed, so that the next lines
+    are not appended to it.
+    Returns the same as load_journal.
+    """
+    finished_files = load_journal()
+
+    _make_journal_directory()
+    temp_file = Constants.run_journal_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as journal:
+        for cache_key, file_annotations in finished_files.values():
+            journal.write(_journal_line(cache_key, file_annotations))
+    os.replace(temp_file, Constants.run_journal_file)
+    return finished_files
+
+
+def record_file(cache_key, file_annotations):
+    """
+    Append a finished transcript to the journal
+    """
+    _make_journal_directory()
+    with open(Constants.run_journal_file, 'a', encoding='utf-8') as journal:
+        journal.write(_journal_line(cache_key, file_annotations))
+        journal.flush()
+        os.fsync(journal.fileno())
+
+
+def _journal_line(cache_key, file_annotations):
+    entry = file_annotations.to_dict()
+    entry['cache_key'] = cache_key
+    return json.dumps(entry, separators=(',', ':')) + '\n'
+
+
+def _make_journal_directory():
+    directory = os.path.dirname(Constants.run_journal_file)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
@@ -0,0 +1,155 @@
+import multiprocessing
+import queue
+import traceback
+
+from _SourceCode import AnnotationUtils, AnnotationCache, Constants
+from _SourceCode.FileDataExtraction.TextExtraction import extract_text_from_txt_file
+from _SourceCode.ToolsUtils import ModelManager
+from _SourceCode.ToolsUtils.SpaCyUtils import get_spacy_raw_results_batch
+from _SourceCode.ToolsUtils.StanfordNER import StanfordNER
+
+"""
+Pipeline-parallel annotation of the hearing files.
+Every NER tool has its own long-lived processes (one or more per tool) that only load the model of that tool and
+go through all the files at their own pace, so the fast tools never wait for the slow ones.
+The main process is the merge stage: it keeps the raw results of each file until all tools are done with it,
+then filters and combines them, cleans them (duplicates, overlaps...) and writes the outputs of the file.
+"""
+
+
+def annotate_files_with_tool_pipeline(files, directory, tool_workers, ignore_1st_page_info,
+                                      create_annotation_output_file, insert_labels_in_text, write_statistics):
+    """
+    Annotate the files with dedicated processes for each tool.
+    tool_workers is a dict with the number of processes of each tool, e.g. {'presidio': 1, 'spacy': 2, 'stanford': 1}
+    Yields the FileAnnotations of each file as soon as all the tools are done with it.
+    """
+    context = multiprocessing.get_context()
+    result_queue = context.Queue()
+    processes = []
+
+    for tool in AnnotationUtils.tools:
+        worker_count = max(tool_workers.get(tool, 1), 1)
+        task_queue = context.Queue()
+        for index, file in enumerate(files):
+            task_queue.put((index, file))
+        for _ in range(worker_count):
+            task_queue.put(None)  # one stop signal per process
+
+        for _ in range(worker_count):
+            process = context.Process(target=_tool_process,
+                                      args=(tool, task_queue, result_queue, ignore_1st_page_info),
+                                      name=f'{tool}_worker')
+            process.start()
+            processes.append(process)
+        print(f"Started {worker_count} process(es) for {tool}.")
+
+    pending_results = {}  # file index -> {tool: result}
+    files_done = 0
+
+    try:
+        while files_done < len(files):
+            try:
+                index, tool, result, error = result_queue.get(timeout=5)
+            except queue.Empty:
+                _check_processes(processes)
+                continue
+
+            if error is not None:
+                raise RuntimeError(f"{tool} failed on {files[index]}:\n{error}")
+
+            file_results = pending_results.setdefault(index, {})
+            file_results[tool] = result
+            if len(file_results) < len(AnnotationUtils.tools):
+                continue
+
+            # Merge stage: all the tools are done with this file
+            del pending_results[index]
+            files_done += 1
+            file = files[index]
+            text = extract_text_from_txt_file(file)
+            AnnotationCache.save_raw_results(text, ignore_1st_page_info, file_results)
+            yield AnnotationUtils._annotations_from_tool_results(
+                file=file,
+                file_number=index + 1,
+                directory=directory,
+                text=text,
+                tool_results=file_results,
+                create_annotation_output_file=create_annotation_output_file,
+                insert_labels_in_text=insert_labels_in_text,
+                write_statistics=write_statistics)
+
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+
+def _tool_process(tool, task_queue, result_queue, ignore_1st_page_info):
+    """
+    Runs in the process of a single tool: loads the model of the tool once and goes through the files
+    """
+    AnnotationUtils.skip_1st_page_info_presidio = ignore_1st_page_info
+    ModelManager.preload([AnnotationUtils.tool_models[tool]])
+
+    # StanfordNER can tag several files at once, one per JVM of its server
+    # spaCy batches the utterances of several files together
+    batch_size = 1
+    if tool == AnnotationUtils.TOOL_STANFORD_NER:
+        batch_size = Constants.stanford_ner_workers
+    elif tool == AnnotationUtils.TOOL_SPACY:
+        batch_size = Constants.spacy_files_per_batch
+
+    stop = False
+    while not stop:
+        tasks, stop = _get_tasks(task_queue, batch_size)
+        if not tasks:
+            continue
+
+        texts = [extract_text_from_txt_file(file) for _, file in tasks]
+        try:
+            if tool == AnnotationUtils.TOOL_STANFORD_NER:
+                results = StanfordNER().get_stanford_ner_raw_results_batch(texts)
+            elif tool == AnnotationUtils.TOOL_SPACY:
+                results = get_spacy_raw_results_batch(texts)
+            else:
+                results = [AnnotationUtils.run_tool(tool, text) for text in texts]
+        except Exception:
+            for index, _ in tasks:
+                result_queue.put((index, tool, None, traceback.format_exc()))
+            return
+
+        for (index, file), result in zip(tasks, results):
+            print(f"{tool} ---- done with {file}")
+            result_queue.put((index, tool, result, None))
+
+    ModelManager.print_model_report()
+
+
+def _get_tasks(task_queue, batch_size):
+    """
+    Wait for the next file and take up to batch_size files from the queue.
+    Returns the tasks and True if the stop signal was reached.
+    """
+    tasks = []
+    task = task_queue.get()
+    while task is not None:
+        tasks.append(task)
+        if len(tasks) >= batch_size:
+            return tasks, False
+        try:
+            task = task_queue.get_nowait()
+        except queue.Empty:
+            return tasks, False
+    return tasks, True
+
+
+def _check_processes(processes):
+    """
+    Raise an error if a tool process died before finishing its files
+    """
+    for process in processes:
+        if not process.is_alive() and process.exitcode != 0:
+            raise RuntimeError(f"The process {process.name} stopped unexpectedly (exit code {process.exitcode}).")
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from _SourceCode import Constants
+from _SourceCode.ToolsUtils.MemoryMappedWeights import safetensors_file_name
+
+"""
+Persistent cache of the zero shot classifications (see Classifier.py), kept in a sqlite database so that an entity
+classified once ("California", "Mexican"...) never goes through the model again, in later files or later runs.
+The key of a classification is the hash of the normalized entity, the set of candidate labels and the model
+signature: a different label list or model simply doesn't find the old entries.
+The database is bounded: when it has more than classification_cache_max_entries classifications, the least recently
+used ones are removed.
+Several processes can use the database at the same time (sqlite locks it while writing), every process opens its own
+connection.
+"""
+
+_connection = None
+_connection_pid = None
+_model_signature = None
+
+
+def normalize_entity(entity_str):
+    """
+    Collapse the white spaces of the entity, the case is kept since the model is case sensitive
+    """
+    return ' '.join(entity_str.split())
+
+
+def get_classification_key(entity_str, labels):
+    key = json.dumps([normalize_entity(entity_str), sorted(labels), get_model_signature()])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def get_model_signature():
+    """
+    Hash of the configuration of the zero shot model, the size of its weights files (pytorch_model.bin and/or
+    model.safetensors, hashing the whole weights every run would take too long), its quantization and the classifier
+    mode
+    """
+    global _model_signature
+    if _model_signature is None:
+        model_directory = os.path.join(Constants.resources_folder, 'facebook_bart_large_mnli')
+        signature = hashlib.sha256()
+        for file_name in ['config.json', 'pytorch_model.bin', safetensors_file_name]:
+            file_path = os.path.join(model_directory, file_name)
+            if not os.path.exists(file_path):
+                continue
+            if file_name.endswith('.json'):
+                with open(file_path, 'rb') as f:
+                    signature.update(f.read())
+            else:
+                signature.update(f'{file_name}:{os.path.getsize(file_path)}'.encode('utf-8'))
+        if Constants.classifier_quantized:  # the int8 model can return other labels than the fp32 model
+            signature.update(b'quantized:int8')
+        if Constants.classifier_mode != 'nli':
+            signature.update(f'mode:{Constants.classifier_mode}'.encode('utf-8'))
+        _model_signature = signature.hexdigest()
+    return _model_signature
+
+
+def get_cached_classifications(keys):
+    """
+    Return the cached label of each key that is in the cache ({key: label}, the label can be None if the model
+    returned no label). The keys that were found are marked as recently used.
+    """
+    if not keys:
+        return {}
+
+    connection = _get_connection()
+    found = {}
+    keys = list(keys)
+    for start in range(0, len(keys), 500):  # sqlite limits the number of parameters of a query
+        batch = keys[start:start + 500]
+        placeholders = ','.join('?' * len(batch))
+        rows = connection.execute(f'SELECT key, label FROM classifications WHERE key IN ({placeholders})', batch)
+        found.update(dict(rows.fetchall()))
+
+    if found:
+        with connection:
+            connection.executemany('UPDATE classifications SET last_used = ? WHERE key = ?',
+                                   [(time.time(), key) for key in found])
+    return found
+
+
+def save_classifications(classifications):
+    """
+    Store classifications: a list of (key, entity, labels, label).
+    The least recently used entries are removed if the cache gets bigger than classification_cache_max_entries.
+    """
+    if not classifications:
+        return
+
+    connection = _get_connection()
+    now = time.time()
+    with connection:
+        connection.executemany(
+            'INSERT OR REPLACE INTO classifications (key, entity, labels, label, last_used) VALUES (?, ?, ?, ?, ?)',
+            [(key, entity, json.dumps(labels), label, now) for key, entity, labels, label in classifications])
+
+        entries_count = connection.execute('SELECT COUNT(*) FROM classifications').fetchone()[0]
+        extra_entries = entries_count - Constants.classification_cache_max_entries
+        if extra_entries > 0:
+            connection.execute('DELETE FROM classifications WHERE key IN '
+                               '(SELECT key FROM classifications ORDER BY last_used LIMIT ?)', (extra_entries,))
+
+
+def _get_connection():
+    """
+    Open the database once per process (a connection can't be shared with a forked worker)
+    """
+    global _connection, _connection_pid
+    if _connection is None or _connection_pid != os.getpid():
+        directory = os.path.dirname(Constants.classification_cache_file)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        _connection = sqlite3.connect(Constants.classification_cache_file, timeout=60)
+        _connection.execute('CREATE TABLE IF NOT EXISTS classifications ('
+                            'key TEXT PRIMARY KEY, entity TEXT, labels TEXT, label TEXT, last_used REAL)')
+        _connection.execute('CREATE INDEX IF NOT EXISTS classifications_last_used ON classifications (last_used)')
+        _connection.commit()
+        _connection_pid = os.getpid()
+    return _connection
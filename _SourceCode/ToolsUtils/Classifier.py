@@ -1,34 +1,195 @@
-from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
 import os.path
 
 from _SourceCode import Constants
+from _SourceCode.ToolsUtils import ClassificationCache, ModelManager
+from _SourceCode.ToolsUtils.EmbeddingClassifier import EmbeddingClassifier
+from _SourceCode.ToolsUtils.MemoryMappedWeights import get_safetensors_path, load_memory_mapped_model
 
-directory = "_Resources\\facebook_bart_large_mnli\\pytorch_model.bin"
-
-if not os.path.exists(directory):
-    print(f"\nThe BART model file was not found in the '_Resources\\facebook_bart_large_mnli'"
-          f"directory.\n"
-          f"The anonymization of the NRP and Location entities will use a generic label.\n")
-    classifier = None
-else:
-    directory = os.path.join(Constants.resources_folder, 'facebook_bart_large_mnli')
-    # Load model and tokenizer from the saved directory
-    tokenizer = AutoTokenizer.from_pretrained(directory)
-    model = AutoModelForSequenceClassification.from_pretrained(directory)
-    classifier = pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+ZERO_SHOT_CLASSIFIER = 'zero_shot_classifier'
+EMBEDDING_CLASSIFIER = 'embedding_classifier'
+classifier_models = {  # classifier mode (Constants.classifier_mode) -> name of its model in ModelManager
+    'nli': ZERO_SHOT_CLASSIFIER,
+    'embedding': EMBEDDING_CLASSIFIER,
+}
+model_directory = os.path.join(Constants.resources_folder, 'facebook_bart_large_mnli')
 
 """
 Class for the zero shot model. The labels are given when calling the classify_entity function and
 it returns one of the labels based on confidence.
+The classifications are kept in memory for the process and in a persistent cache (see ClassificationCache.py), and
+prefetch_classifications sends all the entities that aren't in the cache yet through the model in batches.
+The BART model (and transformers) is only loaded the first time an entity is not in the cache (see ModelManager.py),
+so a run whose entities are all cached, or that has no LOCATION/NRP entity, never loads it.
+Constants.classifier_mode selects how the entities are classified: 'nli' (the zero shot pipeline, one forward pass per
+entity and label) or 'embedding' (see EmbeddingClassifier.py, one encoding per entity).
+If the weights were converted to model.safetensors, they are memory mapped instead of unpickled from pytorch_model.bin
+(see MemoryMappedWeights.py): the model loads faster and the worker processes share its weights.
 """
 
+_classifications = {}  # classification key -> label, for the life of the process
+_classification_counts = {'cache': 0, 'model': 0}
+_classifier_available = None
+
+
+def load_zero_shot_classifier():
+    return create_zero_shot_classifier(Constants.classifier_quantized)
+
+
+def load_embedding_classifier():
+    return create_embedding_classifier(Constants.classifier_quantized)
+
+
+def create_zero_shot_classifier(quantized=False):
+    """
+    Load the tokenizer and the model from the saved directory into a zero shot classification pipeline.
+    With quantized, the weights of the linear layers are converted to int8 and the activations are quantized on the fly
+    (dynamic quantization): faster on CPU, see ClassifierQuantizationBenchmark.py for the speed-up and the agreement
+    of the labels with the fp32 model.
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_directory)
+    model = _prepare_for_inference(_load_model(AutoModelForSequenceClassification), quantized)
+    return pipeline("zero-shot-classification", model=model, tokenizer=tokenizer)
+
+
+def create_embedding_classifier(quantized=False):
+    """
+    Load the tokenizer and the encoder of the BART model (without the classification head) into an EmbeddingClassifier
+    """
+    from transformers import AutoModel, AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(model_directory)
+    encoder = _prepare_for_inference(_load_model(AutoModel).get_encoder(), quantized)
+    return EmbeddingClassifier(tokenizer, encoder)
+
+
+def _load_model(model_class):
+    """
+    Load the BART model with the given transformers Auto class, from the memory mapped model.safetensors if the
+    weights were converted (and classifier_mmap_weights is set), otherwise from pytorch_model.bin
+    """
+    if Constants.classifier_mmap_weights and os.path.exists(get_safetensors_path(model_directory)):
+        model = load_memory_mapped_model(model_class, model_directory)
+        if model is not None:
+            return model
+    return model_class.from_pretrained(model_directory)
+
+
+def _prepare_for_inference(model, quantized):
+    import torch
+
+    if Constants.classifier_threads:
+        torch.set_num_threads(Constants.classifier_threads)
+
+    model.eval()
+    if quantized:
+        # in place: a copy of the model would copy all its weights (and can't copy the mapped weights file)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+ModelManager.register_model(ZERO_SHOT_CLASSIFIER, load_zero_shot_classifier)
+ModelManager.register_model(EMBEDDING_CLASSIFIER, load_embedding_classifier)
+
+
+def is_classifier_available():
+    """
+    Check (once) that the BART model file exists (pytorch_model.bin or its safetensors copy), without loading the model
+    """
+    global _classifier_available
+    if _classifier_available is None:
+        _classifier_available = (os.path.exists(os.path.join(model_directory, 'pytorch_model.bin'))
+                                 or os.path.exists(get_safetensors_path(model_directory)))
+        if not _classifier_available:
+            print(f"\nThe BART model file was not found in the '_Resources\\facebook_bart_large_mnli'"
+                  f"directory.\n"
+                  f"The anonymization of the NRP and Location entities will use a generic label.\n")
+    return _classifier_available
+
 
 def classify_entity(entity_str, labels):
-    if classifier is None:
+    if not is_classifier_available():
         return None
 
-    result = classifier(entity_str, candidate_labels=labels, multi_label=True)
-    if result['labels']:
-        return result['labels'][0]  # Return the top classification
-    else:
-        return None
+    key = ClassificationCache.get_classification_key(entity_str, labels)
+    if key not in _classifications:
+        prefetch_classifications([entity_str], labels)
+    return _classifications[key]
+
+
+def prefetch_classifications(entities, labels):
+    """
+    Classify all the entities that are not classified yet, so that classify_entity finds them in memory.
+    The entities that are in the persistent cache are read from it, the others go through the model in batches of
+    classifier_batch_size and are stored in the cache.
+    """
+    if not is_classifier_available():
+        return
+
+    # the entities that aren't in memory yet (each one once)
+    keys = {}
+    for entity_str in entities:
+        key = ClassificationCache.get_classification_key(entity_str, labels)
+        if key not in _classifications:
+            keys[key] = ClassificationCache.normalize_entity(entity_str)
+    if not keys:
+        return
+
+    cached_classifications = ClassificationCache.get_cached_classifications(keys.keys())
+    _classifications.update(cached_classifications)
+    _classification_counts['cache'] += len(cached_classifications)
+
+    keys_to_classify = [key for key in keys if key not in cached_classifications]
+    if not keys_to_classify:
+        return
+
+    classifier = ModelManager.get_model(classifier_models[Constants.classifier_mode])
+    batch_size = get_batch_size(Constants.classifier_mode)
+    for start in range(0, len(keys_to_classify), batch_size):
+        batch_keys = keys_to_classify[start:start + batch_size]
+        batch_labels = run_classifier(classifier, [keys[key] for key in batch_keys], labels)
+
+        classifications = []
+        for key, label in zip(batch_keys, batch_labels):
+            _classifications[key] = label
+            classifications.append((key, keys[key], labels, label))
+        ClassificationCache.save_classifications(classifications)
+        _classification_counts['model'] += len(batch_keys)
+
+
+def get_batch_size(mode):
+    """
+    Number of entities sent through the model at once: the embedding classifier encodes an entity in a single pass
+    so it takes bigger batches than the zero shot pipeline (a pass per entity and label)
+    """
+    return Constants.embedding_classifier_batch_size if mode == 'embedding' else Constants.classifier_batch_size
+
+
+def run_classifier(classifier, entities, labels):
+    """
+    Send the entities through the classifier (a zero shot pipeline or an EmbeddingClassifier) at once, in inference
+    mode (no autograd tracking), and return the top label of each entity (None if the model returned no label)
+    """
+    if isinstance(classifier, EmbeddingClassifier):
+        return classifier.classify(entities, labels)
+
+    import torch
+
+    with torch.inference_mode():
+        results = classifier(entities, candidate_labels=labels, multi_label=True,
+                             batch_size=Constants.classifier_batch_size)
+    if isinstance(results, dict):  # the pipeline returns a dict instead of a list for a single entity
+        results = [results]
+    return [result['labels'][0] if result['labels'] else None for result in results]
+
+
+def print_classification_report():
+    """
+    Output how many classifications came from the cache and how many needed the model
+    """
+    if _classification_counts['cache'] or _classification_counts['model']:
+        print(f"\nZero shot classifications: {_classification_counts['cache']} from the cache, "
+              f"{_classification_counts['model']} by the model")
+    if is_classifier_available() and not ModelManager.is_loaded(classifier_models[Constants.classifier_mode]):
+        print("The BART model was not needed and was not loaded")
@@ -0,0 +1,51 @@
+"""
+Fast alternative to the zero shot (NLI) classification of Classifier.py.
+The NLI pipeline runs the BART model once for every (entity, label) pair. Here the encoder of the same BART model
+encodes each entity once (the mean of its token embeddings) and the entity gets the label whose embedding is the most
+similar (cosine similarity). The embeddings of a list of labels are computed once and kept, so classifying n entities
+costs n encodings, done in batches, whatever the number of labels.
+"""
+
+
+class EmbeddingClassifier:
+    """
+    'tokenizer' and 'encoder' are the tokenizer and the encoder of the BART model
+    'label_embeddings' has the normalized embeddings of each list of labels already used (tuple of labels -> tensor)
+    """
+
+    def __init__(self, tokenizer, encoder):
+        self.tokenizer = tokenizer
+        self.encoder = encoder
+        self.label_embeddings = {}
+
+    def encode(self, texts):
+        """
+        Return the normalized embeddings of the texts (one row per text), encoded in a single forward pass
+        """
+        import torch
+
+        inputs = self.tokenizer(texts, padding=True, truncation=True, return_tensors='pt')
+        with torch.inference_mode():
+            token_embeddings = self.encoder(input_ids=inputs['input_ids'],
+                                            attention_mask=inputs['attention_mask']).last_hidden_state
+
+            # mean of the embeddings of the tokens, without the padding
+            mask = inputs['attention_mask'].unsqueeze(-1).to(token_embeddings.dtype)
+            embeddings = (token_embeddings * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            return torch.nn.functional.normalize(embeddings, dim=-1)
+
+    def get_label_embeddings(self, labels):
+        labels = tuple(labels)
+        if labels not in self.label_embeddings:
+            self.label_embeddings[labels] = self.encode(list(labels))
+        return self.label_embeddings[labels]
+
+    def classify(self, entities, labels):
+        """
+        Return the label most similar to each entity
+        """
+        import torch
+
+        with torch.inference_mode():
+            similarities = self.encode(entities) @ self.get_label_embeddings(labels).T
+            return [labels[index] for index in similarities.argmax(dim=1).tolist()]
@@ -0,0 +1,76 @@
+import os
+import re
+
+from _SourceCode import Constants
+
+"""
+Offline gazetteer giving the type of the most common locations of the transcripts (US states, California cities and
+counties, countries, ZIP codes) without the zero shot model.
+The lists are the text files of Constants.gazetteer_folder (one place per line, the lines starting with '#' are
+comments). They are read the first time a location is looked up into a single dict from the case folded place to its
+type. A place in several lists gets the type of the first list (Georgia is a state, Los Angeles a city).
+"""
+
+gazetteer_files = {  # file -> location type (a key of location_suffixes in Location_Pseudonymization.py)
+    'states.txt': 'State',
+    'california_cities.txt': 'City',
+    'california_counties.txt': 'County',
+    'countries.txt': 'Country',
+}
+zip_code_pattern = r'\d{5}(?:-\d{4})?'
+
+_location_types = None  # case folded place -> location type
+_lookups = {}  # case folded location -> found in the gazetteer or not, every location looked up by the process
+
+
+def get_location_type(location):
+    """
+    Return the type of the location if it's in the gazetteer (or is a ZIP code), None otherwise
+    """
+    key = normalize_location(location)
+    if re.fullmatch(zip_code_pattern, key):
+        location_type = 'Zip Code'
+    else:
+        location_type = _get_location_types().get(key)
+
+    _lookups[key] = location_type is not None
+    return location_type
+
+
+def normalize_location(location):
+    """
+    Case fold the location, collapse its white spaces and remove the punctuation around it and a leading 'the'
+    """
+    key = ' '.join(location.casefold().split()).strip('.,;:!?\'"()[] ')
+    if key.startswith('the '):
+        key = key[len('the '):]
+    return key
+
+
+def print_gazetteer_report():
+    """
+    Output how many of the locations looked up were found in the gazetteer
+    """
+    if not _lookups:
+        return
+
+    found = sum(_lookups.values())
+    print(f"\nGazetteer: {found} of {len(_lookups)} locations found ({found / len(_lookups) * 100:.1f}%), "
+          f"{len(_lookups) - found} left to the classifier")
+
+
+def _get_location_types():
+    global _location_types
+    if _location_types is None:
+        _location_types = {}
+        for file_name, location_type in gazetteer_files.items():
+            file_path = os.path.join(Constants.gazetteer_folder, file_name)
+            if not os.path.exists(file_path):
+                print(f"The gazetteer file {file_path} was not found.")
+                continue
+
+            with open(file_path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip() and not line.startswith('#'):
+                        _location_types.setdefault(normalize_location(line), location_type)
+    return _location_types
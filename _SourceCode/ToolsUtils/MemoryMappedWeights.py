@@ -0,0 +1,120 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+"""
+Memory mapped loading of the weights of a transformers model from a safetensors file.
+pytorch_model.bin is a pickle: every process that loads it deserializes the whole file into its own memory (~1.6 GB for
+BART). A safetensors file is a json header followed by the raw tensors, so the tensors of the model can point directly
+into the file mapped in memory: the model is ready as soon as the file is mapped, the pages are read from the disk when
+they are used and all the processes loading the same file (the anonymization workers) share them in the page cache.
+The file is mapped copy on write (ACCESS_COPY): the file is never modified and a process only gets a private copy of
+the pages it writes (quantize_dynamic creates new int8 weights, so a quantized model doesn't share its weights).
+
+The safetensors file is written once next to pytorch_model.bin, from the root folder:
+    python -m _SourceCode.ToolsUtils.MemoryMappedWeights [model directory]
+"""
+
+safetensors_file_name = 'model.safetensors'
+safetensors_dtypes = {  # dtype in the safetensors header -> name of the torch dtype
+    'F64': 'float64', 'F32': 'float32', 'F16': 'float16', 'BF16': 'bfloat16',
+    'I64': 'int64', 'I32': 'int32', 'I16': 'int16', 'I8': 'int8', 'U8': 'uint8', 'BOOL': 'bool',
+}
+
+
+def get_safetensors_path(model_directory):
+    return os.path.join(model_directory, safetensors_file_name)
+
+
+def convert_to_safetensors(model_directory):
+    """
+    Write the weights of the model of the directory (pytorch_model.bin) into model.safetensors in the same directory.
+    The model is saved by transformers, which stores the weights shared by several layers (the embeddings) once.
+    """
+    from transformers import AutoModelForSequenceClassification
+
+    safetensors_path = get_safetensors_path(model_directory)
+    print(f"Converting the weights of {model_directory} into {safetensors_path}...")
+    model = AutoModelForSequenceClassification.from_pretrained(model_directory)
+
+    # saved in a folder of the model directory first: save_pretrained also writes the config, which is kept as it is
+    with tempfile.TemporaryDirectory(dir=model_directory) as temporary_directory:
+        model.save_pretrained(temporary_directory, safe_serialization=True, max_shard_size='100GB')
+        shutil.move(os.path.join(temporary_directory, safetensors_file_name), safetensors_path)
+    print(f"Wrote {safetensors_path} ({os.path.getsize(safetensors_path) / 1024 ** 2:.0f} MB)")
+
+
+def read_memory_mapped_tensors(file_path):
+    """
+    Map the safetensors file in memory and return its tensors (name -> tensor) pointing into the mapped file,
+    and the mapped file (which must be kept as long as the tensors are used)
+    """
+    import torch
+
+    with open(file_path, 'rb') as f:
+        header_size = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, tensor_info in header.items():
+        if name == '__metadata__':
+            continue
+
+        dtype = getattr(torch, safetensors_dtypes[tensor_info['dtype']])
+        start, end = tensor_info['data_offsets']
+        if start == end:  # torch.frombuffer doesn't take empty buffers
+            tensors[name] = torch.empty(tensor_info['shape'], dtype=dtype)
+            continue
+
+        element_size = torch.tensor([], dtype=dtype).element_size()
+        tensors[name] = torch.frombuffer(mapped_file, dtype=dtype, count=(end - start) // element_size,
+                                         offset=data_start + start).reshape(tensor_info['shape'])
+    return tensors, mapped_file
+
+
+def load_memory_mapped_model(model_class, model_directory):
+    """
+    Create the model (model_class: a transformers Auto class) from the configuration of the directory without
+    initializing its weights, then point its weights to the memory mapped safetensors file.
+    Returns None if a weight of the model is not in the file (the model must then be loaded with from_pretrained).
+    """
+    from transformers import AutoConfig
+    from transformers.modeling_utils import no_init_weights
+
+    config = AutoConfig.from_pretrained(model_directory)
+    with no_init_weights():  # the weights are allocated but never written, so they take no memory
+        model = model_class.from_config(config)
+
+    tensors, mapped_file = read_memory_mapped_tensors(get_safetensors_path(model_directory))
+
+    # the state dict has every name of the weights shared by several layers, they are only set once
+    loaded_weights = set()
+    prefix = model.base_model_prefix + '.'
+    for name, weight in model.state_dict(keep_vars=True).items():
+        tensor = tensors.get(name, tensors.get(prefix + name))  # a base model (AutoModel) has no prefix
+        if tensor is not None and id(weight) not in loaded_weights:
+            weight.data = tensor
+            loaded_weights.add(id(weight))
+
+    missing_weights = [name for name, weight in model.state_dict(keep_vars=True).items()
+                       if id(weight) not in loaded_weights]
+    if missing_weights:
+        print(f"{len(missing_weights)} weights of the model are not in {safetensors_file_name} "
+              f"({', '.join(missing_weights[:3])}...)")
+        return None
+
+    model.tie_weights()
+    model.mapped_weights_file = mapped_file  # the tensors point into it
+    return model
+
+
+if __name__ == '__main__':
+    from _SourceCode.ToolsUtils.Classifier import model_directory
+
+    convert_to_safetensors(sys.argv[1] if len(sys.argv) > 1 else model_directory)
@@ -0,0 +1,57 @@
+import os
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+"""
+Memory used by the current process, to compare how the models are loaded.
+'rss' is all the memory of the process in RAM, including the pages it shares with other processes (a memory mapped
+model file in the page cache). 'uss' is the memory only this process uses (what would be freed if it ended) and 'pss'
+is the uss plus its share of the shared pages. They are read with psutil if it's installed, otherwise from /proc
+(Linux), and are None when they are not available (uss and pss on Windows without psutil).
+"""
+
+
+def get_memory_usage():
+    """
+    Return the rss, uss and pss of the current process in bytes
+    """
+    if psutil is not None:
+        process = psutil.Process()
+        try:
+            memory = process.memory_full_info()
+            return {'rss': memory.rss, 'uss': memory.uss, 'pss': getattr(memory, 'pss', None)}
+        except psutil.AccessDenied:
+            return {'rss': process.memory_info().rss, 'uss': None, 'pss': None}
+
+    memory = {'rss': None, 'uss': None, 'pss': None}
+    smaps_rollup = _read_proc_file('/proc/self/smaps_rollup')
+    if smaps_rollup:
+        memory['rss'] = smaps_rollup.get('Rss')
+        memory['pss'] = smaps_rollup.get('Pss')
+        memory['uss'] = smaps_rollup.get('Private_Clean', 0) + smaps_rollup.get('Private_Dirty', 0)
+    else:
+        memory['rss'] = _read_proc_file('/proc/self/status').get('VmRSS')
+    return memory
+
+
+def format_memory_usage(memory):
+    return ', '.join(f'{name} {value / 1024 ** 2:.0f} MB' for name, value in memory.items() if value is not None)
+
+
+def _read_proc_file(file_path):
+    """
+    Read the 'Name: value kB' lines of a /proc file into a dict (in bytes), empty if the file doesn't exist
+    """
+    if not os.path.exists(file_path):
+        return {}
+
+    values = {}
+    with open(file_path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[0].endswith(':') and parts[2] == 'kB':
+                values[parts[0][:-1]] = int(parts[1]) * 1024
+    return values
@@ -0,0 +1,83 @@
+import threading
+import time
+
+"""
+Keeps the models used by the tools loaded for the life of the process (or worker).
+Each model is registered under a name with a function that loads it. The model is only loaded the first time
+it is asked for and every later call reuses the same object.
+The time each load took and how often the loaded model was reused are kept to be reported at the end of a run.
+"""
+
+_loaders = {}  # model name -> function that loads the model
+_models = {}  # model name -> loaded model
+_load_times = {}  # model name -> seconds it took to load the model
+_reuse_counts = {}  # model name -> # of times the loaded model was reused
+_locks = {}  # model name -> lock so that a model is only loaded once when called from multiple threads
+
+
+def register_model(name, loader):
+    """
+    Register the function that loads the model under the given name.
+    The model is not loaded until get_model is called with this name.
+    """
+    _loaders[name] = loader
+    _locks.setdefault(name, threading.Lock())
+
+
+def get_model(name):
+    """
+    Return the model registered under the given name, loading it first if it's the first time it's needed
+    """
+    if name not in _loaders:
+        raise KeyError(f"No model registered under the name '{name}'")
+
+    with _locks[name]:
+        if name in _models:
+            _reuse_counts[name] += 1
+            return _models[name]
+
+        print(f"Loading {name}...")
+        start_time = time.perf_counter()
+        model = _loaders[name]()
+        _load_times[name] = time.perf_counter() - start_time
+
+        _models[name] = model
+        _reuse_counts[name] = 0
+        print(f"Loaded {name} in {_load_times[name]:.2f} seconds")
+        return model
+
+
+def is_loaded(name):
+    """
+    Check if the model is already loaded without loading it
+    """
+    return name in _models
+
+
+def preload(names):
+    """
+    Load the given models ahead of time (for example when a worker process starts)
+    """
+    for name in names:
+        if not is_loaded(name):
+            get_model(name)
+
+
+def get_model_stats():
+    """
+    Return the load time and the reuse count of every loaded model
+    """
+    return {name: {'load_time': _load_times[name], 'reuse_count': _reuse_counts[name]} for name in _models}
+
+
+def print_model_report(model_stats=None):
+    """
+    Output how long each model took to load and how often the loaded model was reused
+    """
+    model_stats = get_model_stats() if model_stats is None else model_stats
+    if not model_stats:
+        return
+
+    print("\n---------MODELS---------")
+    for name, stats in model_stats.items():
+        print(f"{name}: loaded in {stats['load_time']:.2f} seconds, reused {stats['reuse_count']} times")
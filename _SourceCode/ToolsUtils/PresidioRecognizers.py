@@ -2,6 +2,7 @@ import re
 
 from presidio_analyzer import Pattern, PatternRecognizer
 
+from _SourceCode import Constants
 from _SourceCode.FileDataExtraction.TextExtraction import generate_name_combinations
 
 
@@ -83,11 +84,7 @@ class IDRecognizer(PatternRecognizer):
     """
     Simple ID patterns like 12345 or AB1234
     """
-    patterns = [
-        r'\b[A-Z]{0,4}\d{5,10}\b',
-        r'\b[A-Z]{1,4}\d{4,10}\b',
-        r'\b[A-Z]{1,4}\d{2,5}-(?!\d)' # For cut-off IDs
-    ]
+    patterns = Constants.id_patterns
 
     def __init__(self):
         id_patterns = []
@@ -120,7 +117,7 @@ class SpelledOutNamesRecognizer(PatternRecognizer):
     Check for symbols between letters and allow a space between them
     """
 
-    pattern = r'\b([A-Z]([-—])\s?[A-Z](\s?\2\s?[A-Z])*)\b'
+    pattern = Constants.spelled_out_name_pattern
 
     def __init__(self):
         super().__init__(supported_entity="SPELLED_NAME",
@@ -10,11 +10,16 @@ import _SourceCode.ToolsUtils.PresidioRecognizers as PresidioRecognizers
 from _SourceCode.HelperFunctions import contains_keywords
 from _SourceCode.ModelClasses.Annotation import Annotation
 from _SourceCode.AnnotationHelpers.AnnotationChecker import is_invalid_annotation
+from _SourceCode.ToolsUtils import ModelManager
+from _SourceCode.ToolsUtils.TextChunking import analyze_in_chunks
 
+PRESIDIO_ANALYZER = 'presidio_analyzer'
 
-def get_presidio_analysis_results(text, skip_1st_page_info_presidio):
+
+def load_presidio_analyzer():
     """
-    Instantiate Presidio recognizers and call presidio to analyze the text
+    Instantiate the Presidio analyzer with the predefined recognizers and the custom recognizers
+    that are the same for every transcript
     """
     recognizer_registry = RecognizerRegistry()
     recognizer_registry.load_predefined_recognizers()
@@ -31,36 +36,56 @@ def get_presidio_analysis_results(text, skip_1st_page_info_presidio):
     recognizer_registry.add_recognizer(PresidioRecognizers.SimpleURLRecognizer())
     recognizer_registry.add_recognizer(PresidioRecognizers.SimplePhoneNumberRecognizer())
 
+    return AnalyzerEngine(registry=recognizer_registry)
+
+
+ModelManager.register_model(PRESIDIO_ANALYZER, load_presidio_analyzer)
+
+
+def get_presidio_raw_results(text, skip_1st_page_info_presidio, text_range=None):
+    """
+    Call presidio to analyze the text and return the unfiltered results as [start, end, entity_type, score].
+    The analyzer is loaded once per process, the recognizers for the first page information of this transcript
+    are passed along with the request only.
+    The recognizers are made from the whole text, then the text is analyzed chunk by chunk.
+    With text_range (start, end), only the chunks starting in the range are analyzed (a shard of the transcript).
+    """
+    analyzer = ModelManager.get_model(PRESIDIO_ANALYZER)
+
     # Add the first name recognizer patterns from the first page
+    ad_hoc_recognizers = []
     if not skip_1st_page_info_presidio:
         name_recognizers, location_recognizer, organization_recognizer = get_first_page_recognizers(text)
         if name_recognizers is not None:
-            recognizer_registry.add_recognizer(name_recognizers)
+            ad_hoc_recognizers.append(name_recognizers)
         if organization_recognizer is not None:
-            recognizer_registry.add_recognizer(organization_recognizer)
+            ad_hoc_recognizers.append(organization_recognizer)
         if location_recognizer is not None:
-            recognizer_registry.add_recognizer(location_recognizer)
-
-    analyzer = AnalyzerEngine(registry=recognizer_registry)
-
-    results = analyzer.analyze(
-        text=text,
-        entities=Constants.presidio_labels,
-        score_threshold=0.85,
-        language='en'
-    )
-    total_unfiltered_annotations = len(results)
-    converted = convert_presidio_results_to_annotations(text, results)
-    presidio_results = clean_presidio_results(converted, text)
-    return converted, presidio_results, total_unfiltered_annotations
-
-
-def get_presidio_annotations(text, skip_1st_page_info_presidio):
+            ad_hoc_recognizers.append(location_recognizer)
+
+    # long transcripts are analyzed in chunks, the results have their position in the whole text
+    results = analyze_in_chunks(
+        text,
+        analyze_chunk=lambda chunk: analyzer.analyze(
+            text=chunk,
+            entities=Constants.presidio_labels,
+            score_threshold=Constants.presidio_threshold,
+            language='en',
+            ad_hoc_recognizers=ad_hoc_recognizers
+        ),
+        key=lambda result: (result.start, result.end, result.entity_type),
+        text_range=text_range)
+    return [[result.start, result.end, result.entity_type, round(result.score, 4)] for result in results]
+
+
+def get_presidio_annotations_from_raw_results(text, raw_results):
     """
-    get presidio annotations and merge adjacent annotations
-    if they are next to each other and have the same label
+    Filter and clean the raw results of Presidio (see get_presidio_raw_results),
+    then merge adjacent annotations if they are next to each other and have the same label
     """
-    original_results, presidio_results, total_unfiltered_annotations = get_presidio_analysis_results(text, skip_1st_page_info_presidio)
+    total_unfiltered_annotations = len(raw_results)
+    original_results = convert_presidio_results_to_annotations(text, raw_results)
+    presidio_results = clean_presidio_results(original_results, text)
     merged_annotations = AnnotationCleaner.merge_adjacent_annotations(presidio_results, text)
     false_annotations = list(set(original_results) - set(merged_annotations))
     return merged_annotations, false_annotations, total_unfiltered_annotations
@@ -68,15 +93,15 @@ def get_presidio_annotations(text, skip_1st_page_info_presidio):
 
 def convert_presidio_results_to_annotations(text, presidio_results):
     """
-    convert Presidio result to Annotation
+    convert the raw Presidio results [start, end, entity_type, score] to Annotation
     """
     return [
         Annotation(
-            start=item.start,
-            end=item.end,
-            label=item.entity_type,
-            preview=text[item.start:item.end],
-            source=Constants.SOURCE_PRESIDIO) for item in presidio_results]
+            start=start,
+            end=end,
+            label=entity_type,
+            preview=text[start:end],
+            source=Constants.SOURCE_PRESIDIO) for start, end, entity_type, _ in presidio_results]
 
 
 def get_first_page_recognizers(text):
@@ -1,29 +1,84 @@
 import calendar
 import re
 
+import spacy
 from word2number import w2n
-import en_core_web_trf
 import _SourceCode.Constants as Constants
 from _SourceCode import HelperFunctions
 from _SourceCode.AnnotationHelpers import AnnotationCleaner
 from _SourceCode.AnnotationHelpers.AnnotationChecker import person_titles, is_invalid_annotation
 from _SourceCode.AnnotationHelpers.AnnotationCleaner import remove_symbols_from_date
+from _SourceCode.FileDataExtraction.TextExtraction import utterance_positions
 from _SourceCode.HelperFunctions import contains_keywords
 from _SourceCode.ModelClasses.Annotation import Annotation
+from _SourceCode.ToolsUtils import ModelManager
 from _SourceCode.ToolsUtils.PresidioRecognizers import SpelledOutNamesRecognizer
+from _SourceCode.ToolsUtils.TextChunking import split_into_chunks, remove_overlap_duplicates, is_in_range
 
 
-def get_spacy_annotations(text):
+def load_spacy_model():
     """
-    Give a text and filtered-out annotations that are false
+    Load the configured spaCy pipeline without the components that are not needed for NER
     """
-    # Load the model from a local path
-    # https://spacy.io/models/en#en_core_web_trf
-    spacy_obj = en_core_web_trf.load(disable=["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer"])
-    doc = spacy_obj(text)
-    annotations = convert_spacy_results_to_annotations(
-        [ent for ent in doc.ents if ent.label_ in Constants.spacy_labels])
-    return filter_spacy_results(annotations, text)
+    return spacy.load(Constants.spacy_model, disable=Constants.spacy_disabled_components)
+
+
+ModelManager.register_model(Constants.spacy_model, load_spacy_model)
+
+
+def get_spacy_model():
+    """
+    Get the spaCy pipeline, loaded once and kept for the life of the process
+    """
+    return ModelManager.get_model(Constants.spacy_model)
+
+
+def get_spacy_raw_results_batch(texts, text_ranges=None):
+    """
+    Get the unfiltered entities of several texts as [start, end, label] with their position in the whole text.
+    Each text is split into its utterances and the utterances of all the texts go through nlp.pipe in batches,
+    which uses the CPU much better than one huge Doc per transcript.
+    text_ranges has a (start, end) range or None for each text: only the pieces of the text starting in its range
+    are analyzed (a shard of the transcript, see TranscriptSharding.py).
+    """
+    spacy_obj = get_spacy_model()
+    text_ranges = [None] * len(texts) if text_ranges is None else text_ranges
+
+    pieces = []  # (index of the text, start of the piece in the text, piece)
+    for text_index, (text, text_range) in enumerate(zip(texts, text_ranges)):
+        for start, piece in _get_text_pieces(text):
+            if is_in_range(start, text_range):
+                pieces.append((text_index, start, piece))
+
+    docs = spacy_obj.pipe((piece for _, _, piece in pieces),
+                          batch_size=Constants.spacy_batch_size,
+                          n_process=Constants.spacy_n_process)
+
+    raw_results_per_text = [[] for _ in texts]
+    for (text_index, start, _), doc in zip(pieces, docs):
+        raw_results_per_text[text_index].extend(
+            [start + ent.start_char, start + ent.end_char, ent.label_] for ent in doc.ents)
+
+    return [remove_overlap_duplicates(raw_results, key=tuple) for raw_results in raw_results_per_text]
+
+
+def get_spacy_annotations_from_raw_results(text, raw_results):
+    """
+    Keep the entities with the labels we need from the raw results (see get_spacy_raw_results_batch) and filter them
+    """
+    return filter_spacy_results(convert_spacy_results_to_annotations(text, raw_results), text)
+
+
+def _get_text_pieces(text):
+    """
+    The pieces of the text that go through the model with their position in the text:
+    the utterances (cut into chunks if an utterance is too long) or the chunks of the whole text
+    """
+    if not Constants.spacy_split_utterances:
+        return split_into_chunks(text)
+    return [(start + chunk_start, chunk)
+            for start, utterance in utterance_positions(text)
+            for chunk_start, chunk in split_into_chunks(utterance)]
 
 
 def filter_spacy_results(annotations, text):
@@ -208,17 +263,17 @@ def is_actually_age(text):
     return any(conditions)
 
 
-def convert_spacy_results_to_annotations(annotations):
+def convert_spacy_results_to_annotations(text, raw_results):
     """
-    Convert from SpaCy format to Annotation class
+    Convert the raw spaCy results [start, end, label] to Annotation class, only for the labels in spacy_labels
     """
     return [
         Annotation(
-            start=item.start_char,
-            end=item.end_char,
-            label=item.label_,
-            preview=item.text,
-            source=Constants.SOURCE_SPACY) for item in annotations]
+            start=start,
+            end=end,
+            label=label,
+            preview=text[start:end],
+            source=Constants.SOURCE_SPACY) for start, end, label in raw_results if label in Constants.spacy_labels]
 
 
 def is_number_in_words(text):
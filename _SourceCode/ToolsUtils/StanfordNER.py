@@ -1,42 +1,75 @@
-import nltk.tag.stanford
+import nltk
 
 from _SourceCode import Constants
 from _SourceCode.AnnotationHelpers import AnnotationCleaner
 from _SourceCode.AnnotationHelpers.AnnotationChecker import is_invalid_annotation
 from _SourceCode.HelperFunctions import contains_keywords
 from _SourceCode.ModelClasses.Annotation import Annotation
+from _SourceCode.ToolsUtils import ModelManager
+from _SourceCode.ToolsUtils.StanfordNERServer import StanfordNERServer
+from _SourceCode.ToolsUtils.TextChunking import split_into_chunks, is_in_range
+
+STANFORD_NER_SERVER = 'stanford_ner_server'
+
+
+def load_stanford_ner_server():
+    """
+    Start the pool of JVMs that keep the StanfordNER model loaded
+    """
+    return StanfordNERServer(worker_count=Constants.stanford_ner_workers).start()
+
+
+ModelManager.register_model(STANFORD_NER_SERVER, load_stanford_ner_server)
 
 
 """
-StanfordNER tool is a class object due to the reason that to process files in batches would require a new instance
-to access the StanfordNER model.
-Originally it was 1 instance for all files but processing them in batches would give an error saying the file is in use.
-Therefore, every file has its own instance of StanfordNER.
+StanfordNER is a thin client of the StanfordNER server (see StanfordNERServer.py).
+The server is started once per process and keeps the model loaded, so creating an instance of this class for
+every file doesn't load anything.
 """
 class StanfordNER:
 
-    stanford_ner = None
-    def __init__(self):
+    def get_stanford_ner_raw_results_batch(self, texts, text_ranges=None):
         """
-        Load the stanford NER jar file and model file
+        Give a list of texts and get the tagged tokens (label other than 'O') of each text as [start, end, label].
+        Each text is tagged in chunks of whole utterances (at most stanford_ner_chunk_size characters), so that every
+        request to the server is short whatever the size of the transcript. The chunks of all the texts are sent as
+        one batch and spread over the JVMs of the server.
+        text_ranges has a (start, end) range or None for each text: only the chunks of the text starting in its range
+        are tagged (a shard of the transcript, see TranscriptSharding.py).
         """
-        self.stanford_ner = nltk.tag.stanford.StanfordNERTagger('.\\_Resources\\stanford-ner\\english.all.3class.distsim.crf.ser.gz',
-                                                           '.\\_Resources\\stanford-ner\\stanford-ner-4.2.0.jar',
-                                                           encoding='utf-8')
+        text_ranges = [None] * len(texts) if text_ranges is None else text_ranges
+
+        chunks = []  # (index of the text, start of the chunk in the text, chunk)
+        for text_index, (text, text_range) in enumerate(zip(texts, text_ranges)):
+            for start, chunk in split_into_chunks(text, Constants.stanford_ner_chunk_size, overlap=0):
+                if is_in_range(start, text_range):
+                    chunks.append((text_index, start, chunk))
+
+        stanford_ner_server = ModelManager.get_model(STANFORD_NER_SERVER)
+        tokenized_chunks = [nltk.tokenize.word_tokenize(chunk) for _, _, chunk in chunks]
+        classified_chunks = stanford_ner_server.tag_sents(tokenized_chunks)
+
+        results = [[] for _ in texts]
+        for (text_index, chunk_start, chunk), classified_chunk in zip(chunks, classified_chunks):
+            results[text_index].extend([chunk_start + start, chunk_start + end, label]
+                                       for start, end, label in self.find_token_positions(chunk, classified_chunk))
+        return results
 
-    def get_stanford_ner_annotations(self, text):
+    def get_stanford_ner_annotations_from_raw_results(self, text, raw_results):
         """
-        Give a text and get the cleaned annotation data
+        Merge and filter the raw results (see get_stanford_ner_raw_results_batch)
         """
-
-        if isinstance(self.stanford_ner, nltk.tag.stanford.StanfordNERTagger):
-            tokenized_text = nltk.tokenize.word_tokenize(text)
-            classified_text = self.stanford_ner.tag(tokenized_text)
-            annotation_data = self.find_token_positions(text, classified_text)
-            merged_data = AnnotationCleaner.merge_adjacent_annotations(annotation_data, text)
-            return self.filter_annotation_result(merged_data)
-        else:
-            return []
+        annotation_data = [
+            Annotation(
+                start=start,
+                end=end,
+                label=label,
+                preview=text[start:end],
+                source=Constants.SOURCE_STANFORD_NER
+            ) for start, end, label in raw_results]
+        merged_data = AnnotationCleaner.merge_adjacent_annotations(annotation_data, text)
+        return self.filter_annotation_result(merged_data)
 
     def find_token_positions(self, text, annotations):
         """
@@ -50,14 +83,7 @@ class StanfordNER:
             start = text.find(word, end)
             end = text.find(word, end) + len(word)
             if label != 'O' and start != -1:
-                ann = Annotation(
-                    start=start,
-                    end=end,
-                    label=label,
-                    preview=word,
-                    source=Constants.SOURCE_STANFORD_NER
-                )
-                results.append(ann)
+                results.append([start, end, label])
 
         return results
 
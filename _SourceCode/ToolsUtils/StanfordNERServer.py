@@ -0,0 +1,188 @@
+import multiprocessing.util
+import queue
+import socket
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nltk.internals import find_binary
+
+from _SourceCode import Constants
+
+"""
+Long-running StanfordNER tagging backend.
+Instead of starting a new java process that reloads the CRF model for every transcript (which is what nltk's
+StanfordNERTagger does), a pool of JVM workers running Stanford's NERServer is started once. Each worker loads the
+model once and is reached over a local socket. Batches of token sequences, coming from one or more transcripts,
+are spread over the workers and a worker that crashed or answers with missing tokens is restarted before its request
+is retried. A worker that doesn't answer within stanford_ner_request_timeout is restarted, but the request fails
+instead of being retried (it would most likely time out again): the texts are sent in bounded chunks (see
+StanfordNER.py) so that a request never takes that long.
+"""
+
+SEPARATOR = '/'  # slashTags output format: word/LABEL
+
+
+class StanfordNERWorker:
+    """
+    A single JVM running edu.stanford.nlp.ie.NERServer on a local port.
+    The server reads one line of space separated tokens per connection and answers with the tagged tokens.
+    """
+
+    def __init__(self, java_bin, host='127.0.0.1'):
+        self.java_bin = java_bin
+        self.host = host
+        self.port = None
+        self.process = None
+
+    def start(self):
+        """
+        Start the JVM and wait until the model is loaded and the server accepts connections
+        """
+        self.port = _get_free_port(self.host)
+        command = [
+            self.java_bin, *Constants.stanford_ner_java_options.split(),
+            '-cp', Constants.stanford_ner_jar,
+            'edu.stanford.nlp.ie.NERServer',
+            '-port', str(self.port),
+            '-loadClassifier', Constants.stanford_ner_model,
+            '-encoding', 'utf-8',
+            '-outputFormat', 'slashTags',
+            # same tokenization options as nltk's StanfordNERTagger, the text is already tokenized
+            '-tokenizerFactory', 'edu.stanford.nlp.process.WhitespaceTokenizer',
+            '-tokenizerOptions', 'tokenizeNLs=false',
+        ]
+        self.process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.monotonic() + Constants.stanford_ner_startup_timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise RuntimeError(f"The StanfordNER server on port {self.port} exited while loading the model.")
+            try:
+                # an empty connection is ignored by the server
+                with socket.create_connection((self.host, self.port), timeout=1):
+                    return
+            except OSError:
+                time.sleep(0.5)
+
+        self.stop()
+        raise RuntimeError(f"The StanfordNER server on port {self.port} did not start in "
+                           f"{Constants.stanford_ner_startup_timeout} seconds.")
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def stop(self):
+        if self.is_alive():
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def restart(self):
+        print(f"Restarting the StanfordNER server on port {self.port}.")
+        self.stop()
+        self.start()
+
+    def tag(self, tokens):
+        """
+        Send one sequence of tokens and return a list of (token, label).
+        Raises an OSError if the JVM doesn't answer in time or dies before answering completely.
+        """
+        if not tokens:
+            return []
+
+        with socket.create_connection((self.host, self.port),
+                                      timeout=Constants.stanford_ner_request_timeout) as connection:
+            connection.sendall((' '.join(tokens) + '\n').encode('utf-8'))
+            connection.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = connection.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+
+        tagged_words = b''.join(chunks).decode('utf-8').split()
+        if len(tagged_words) != len(tokens):  # empty or truncated answer: the JVM died while tagging
+            raise ConnectionError(f"The StanfordNER server on port {self.port} returned {len(tagged_words)} tokens "
+                               f"instead of {len(tokens)}.")
+
+        # take the words from the input so that tokens containing the separator are kept as they are
+        return [(token, tagged_word.rsplit(SEPARATOR, 1)[-1]) for token, tagged_word in zip(tokens, tagged_words)]
+
+
+class StanfordNERServer:
+    """
+    Pool of StanfordNERWorker. Started once and shared by every transcript processed in this process.
+    """
+
+    def __init__(self, worker_count=1):
+        java_bin = find_binary('java', env_vars=['JAVAHOME', 'JAVA_HOME'], binary_names=['java.exe'])
+        self.workers = [StanfordNERWorker(java_bin) for _ in range(max(worker_count, 1))]
+        self.idle_workers = queue.Queue()  # a request takes the first worker that is free
+        for worker in self.workers:
+            self.idle_workers.put(worker)
+        self.executor = ThreadPoolExecutor(max_workers=len(self.workers))
+
+    def start(self):
+        """
+        Start all the workers at the same time, they each take a few seconds to load the model
+        """
+        list(self.executor.map(lambda worker: worker.start(), self.workers))
+        # stop the JVMs when the process (or the worker process it lives in) exits
+        multiprocessing.util.Finalize(self, self.stop, exitpriority=10)
+        return self
+
+    def stop(self):
+        for worker in self.workers:
+            worker.stop()
+
+    def tag(self, tokens):
+        """
+        Tag one sequence of tokens
+        """
+        return self.tag_sents([tokens])[0]
+
+    def tag_sents(self, token_sequences):
+        """
+        Tag a batch of token sequences (can come from different transcripts). Sequences are spread over the workers
+        and the results are returned in the same order as the input.
+        """
+        return list(self.executor.map(self._tag_with_idle_worker, token_sequences))
+
+    def _tag_with_idle_worker(self, tokens):
+        """
+        Tag the tokens with the first worker that is free, so a short sequence never waits behind a long one while
+        another worker is idle
+        """
+        worker = self.idle_workers.get()
+        try:
+            for attempt in range(Constants.stanford_ner_max_retries + 1):
+                if not worker.is_alive():
+                    worker.restart()
+                try:
+                    return worker.tag(tokens)
+                except socket.timeout:
+                    print(f"StanfordNER request of {len(tokens)} tokens timed out after "
+                          f"{Constants.stanford_ner_request_timeout} seconds.")
+                    worker.restart()  # for the next requests
+                    raise
+                except OSError as e:
+                    if attempt == Constants.stanford_ner_max_retries:
+                        raise
+                    print(f"StanfordNER request failed ({e}).")
+                    worker.restart()
+        finally:
+            self.idle_workers.put(worker)
+
+
+def _get_free_port(host):
+    """
+    Ask the OS for a port that is currently free
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as temp_socket:
+        temp_socket.bind((host, 0))
+        return temp_socket.getsockname()[1]
@@ -0,0 +1,100 @@
+import _SourceCode.Constants as Constants
+
+"""
+Chunking layer shared by the NER tools for very long transcripts.
+The text is cut at utterance boundaries (the text files have 1 utterance per line) into chunks of a bounded size,
+optionally overlapping, so that the memory used by a tool depends on the size of a chunk and not of the transcript.
+Each chunk is analyzed on its own, the positions of the results are moved back to the position in the whole text
+and the results found twice in the overlap of 2 chunks are only kept once.
+"""
+
+
+def split_into_chunks(text, max_chunk_size=None, overlap=None):
+    """
+    Return a list of (start, chunk) with the position where each chunk starts in the text.
+    A chunk is made of whole lines and is at most max_chunk_size characters long (a single line longer than that
+    is cut at a space). The next chunk starts with the last lines of the previous one that fit in the overlap.
+    """
+    max_chunk_size = Constants.chunk_max_size if max_chunk_size is None else max_chunk_size
+    overlap = Constants.chunk_overlap if overlap is None else overlap
+
+    if len(text) <= max_chunk_size:
+        return [(0, text)]
+
+    pieces = _get_pieces(text, max_chunk_size)  # (start, end) of each line, long lines already cut
+    chunks = []
+    first_piece = 0
+    while first_piece < len(pieces):
+        chunk_start = pieces[first_piece][0]
+        next_piece = first_piece + 1
+        while next_piece < len(pieces) and pieces[next_piece][1] - chunk_start <= max_chunk_size:
+            next_piece += 1
+        chunk_end = pieces[next_piece - 1][1]
+        chunks.append((chunk_start, text[chunk_start:chunk_end]))
+
+        if next_piece == len(pieces):
+            break
+
+        # go back over the last lines of this chunk that fit in the overlap (always moving forward by at least 1 line)
+        overlap_piece = next_piece
+        while overlap_piece - 1 > first_piece and chunk_end - pieces[overlap_piece - 1][0] <= overlap:
+            overlap_piece -= 1
+        first_piece = overlap_piece
+
+    return chunks
+
+
+def _get_pieces(text, max_chunk_size):
+    """
+    Positions (start, end) of each line of the text including its '\n'.
+    Lines longer than max_chunk_size are cut into several pieces at the last space that fits.
+    """
+    pieces = []
+    start = 0
+    for line in text.split('\n'):
+        end = min(start + len(line) + 1, len(text))
+        while end - start > max_chunk_size:
+            cut = text.rfind(' ', start + 1, start + max_chunk_size)
+            cut = start + max_chunk_size if cut == -1 else cut
+            pieces.append((start, cut))
+            start = cut
+        if end > start:
+            pieces.append((start, end))
+        start = end
+    return pieces
+
+
+def remove_overlap_duplicates(results, key):
+    """
+    Keep only the first result of the ones that have the same key (found twice in the overlap of 2 chunks)
+    """
+    unique_results = {}
+    for result in results:
+        unique_results.setdefault(key(result), result)
+    return list(unique_results.values())
+
+
+def analyze_in_chunks(text, analyze_chunk, key, text_range=None):
+    """
+    Run analyze_chunk on each chunk of the text.
+    analyze_chunk returns a list of results that have a start and an end in the chunk, they are moved to their
+    position in the whole text. key is used to detect the results found twice in an overlap.
+    With text_range (start, end), only the chunks starting in the range are analyzed (the chunks are still the chunks
+    of the whole text, see TranscriptSharding.py).
+    """
+    results = []
+    for chunk_start, chunk in split_into_chunks(text):
+        if not is_in_range(chunk_start, text_range):
+            continue
+        for result in analyze_chunk(chunk):
+            result.start += chunk_start
+            result.end += chunk_start
+            results.append(result)
+    return remove_overlap_duplicates(results, key)
+
+
+def is_in_range(position, text_range):
+    """
+    Check if the position is in the (start, end) range, every position is when there's no range
+    """
+    return text_range is None or text_range[0] <= position < text_range[1]
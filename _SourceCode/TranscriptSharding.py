@@ -0,0 +1,90 @@
+import os
+
+from _SourceCode import AnnotationUtils, AnnotationCache, Constants
+from _SourceCode.FileDataExtraction.TextExtraction import extract_text_from_txt_file
+from _SourceCode.ToolsUtils.TextChunking import split_into_chunks, remove_overlap_duplicates
+
+"""
+Splits a long transcript into shards annotated by several workers at the same time (see ParallelAnnotation.py), so a
+huge transcript doesn't keep a single worker busy while the others are done.
+A shard is a range of whole utterances of the transcript. Every worker reads the whole text and only runs the NER
+tools on its range. The NER tools already analyze the text piece by piece (the chunks of TextChunking.py for
+Presidio and StanfordNER, the utterances for spaCy): a worker analyzes the pieces of the whole text that start in
+its range, so every piece is the same as in an unsharded run (the recognizers of the first page of Presidio are also
+made from the whole text).
+The main process puts the raw results of the shards back together in the order of the text (the results found in
+2 shards are only kept once, like in the overlap of 2 chunks) and filters, merges and cleans them on the whole text:
+merge_adjacent_annotations and the overlap handling see the annotations on both sides of the edges of the shards.
+The annotations are the same as if the transcript was annotated by a single worker.
+Benchmarks/TranscriptShardingBenchmark.py checks it on a transcript.
+"""
+
+# key of the raw results of each tool to find the results found twice (see remove_overlap_duplicates)
+raw_result_keys = {
+    AnnotationUtils.TOOL_PRESIDIO: lambda result: tuple(result[:3]),  # without the score
+    AnnotationUtils.TOOL_SPACY: tuple,
+    AnnotationUtils.TOOL_STANFORD_NER: tuple,
+}
+
+
+def get_shard_ranges(directory, file):
+    """
+    Return the (start, end) of each shard of the transcript: whole utterances, at most shard_size characters.
+    A transcript of at most shard_min_size characters has no shards (empty list).
+    """
+    if os.path.getsize(os.path.join(directory, file)) <= Constants.shard_min_size:  # at least 1 byte per character
+        return []
+
+    text = extract_text_from_txt_file(file)
+    if len(text) <= Constants.shard_min_size:
+        return []
+    return split_into_shards(text)
+
+
+def split_into_shards(text):
+    """
+    Return the (start, end) of each shard of the text: whole utterances, at most shard_size characters
+    """
+    return [(start, start + len(shard)) for start, shard in split_into_chunks(text, Constants.shard_size, overlap=0)]
+
+
+def annotate_shard(file, file_number, directory, text_range):
+    """
+    Runs in a worker: the raw results of the NER tools for a shard (text_range) of the transcript
+    """
+    text = extract_text_from_txt_file(file)
+    print(file_number, "----", f"\rProcessing characters {text_range[0]}-{text_range[1]} of: "
+                                f"{os.path.join(directory, file)}...\n")
+    return AnnotationUtils._get_tool_results(text, text_range)
+
+
+def merge_shard_results(shard_results):
+    """
+    Put the raw results of the shards (in the order of the shards) back together into the raw results of the
+    whole text
+    """
+    return {tool: remove_overlap_duplicates([result for tool_results in shard_results for result in tool_results[tool]],
+                                            key=raw_result_keys[tool])
+            for tool in AnnotationUtils.tools}
+
+
+def annotations_from_shards(file, file_number, directory, shard_results, create_annotation_output_file,
+                            insert_labels_in_text, write_statistics):
+    """
+    Runs in the main process once all the shards of the transcript are annotated: merge their raw results, keep them
+    in the cache and filter, merge and clean them on the whole text like for a transcript that wasn't sharded
+    """
+    text = extract_text_from_txt_file(file)
+    print(file_number, "----", f"\rCleaning the merged shards of: {os.path.join(directory, file)}...\n")
+    tool_results = merge_shard_results(shard_results)
+    AnnotationCache.save_raw_results(text, AnnotationUtils.skip_1st_page_info_presidio, tool_results)
+
+    return AnnotationUtils._annotations_from_tool_results(
+        file=file,
+        file_number=file_number,
+        directory=directory,
+        text=text,
+        tool_results=tool_results,
+        create_annotation_output_file=create_annotation_output_file,
+        insert_labels_in_text=insert_labels_in_text,
+        write_statistics=write_statistics)